@@ -1,5 +1,6 @@
 import streamlit as st
 from PIL import Image
+from utils.cancellation_charts import start_chart_warmup
 
 # Page configuration
 st.set_page_config(
@@ -8,6 +9,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Start building the Mechanical Cancellations charts in the background, once per dataset version
+start_chart_warmup()
+
 # Custom CSS for styling
 st.markdown("""
     <style>
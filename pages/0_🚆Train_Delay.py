@@ -1,28 +1,14 @@
 # Import required libraries
 import streamlit as st
 from PIL import Image
-import pandas as pd
-import numpy as np
-import joblib
 import os
+from utils.delay_features import DelayFeatureEncoder, line_for_station
+from utils.live_delays import LIVE_FEATURES, LIVE_REPLAY_ENV, tracker_from_env
+from utils.model_bundle import ModelBundleError, load_delay_model
+from utils.shared_store import open_shared_store
 
 # Define paths using relative paths 
 MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
-model_path = os.path.join(MODEL_DIR, 'delay_predictor.joblib')       # Fixed duplicate path and typo
-features_path = os.path.join(MODEL_DIR, 'features_list.joblib')      # Keep same structure
-metrics_path = os.path.join(MODEL_DIR, 'metrics.joblib')             # Keep same structure
-
-# Print paths for debugging (optional)
-print(f"Model directory: {MODEL_DIR}")
-print(f"Model path: {model_path}")
-
-# Create models directory if it doesn't exist
-os.makedirs(MODEL_DIR, exist_ok=True)
-
-# Load files
-model = joblib.load(model_path)
-features_list = joblib.load(features_path)
-metrics = joblib.load(metrics_path)
 
 # Configure Streamlit page settings
 st.set_page_config(
@@ -31,6 +17,39 @@ st.set_page_config(
     layout="wide"    # Use full width of browser
 )
 
+# Load model once per process (shared serving store, bundle or legacy joblib files)
+@st.cache_resource
+def load_model():
+    shared = open_shared_store()
+    if shared is not None and shared.has_delay_model():
+        return shared.delay_model()
+    return load_delay_model(MODEL_DIR)
+
+try:
+    model, features_list, metrics = load_model()
+except (ModelBundleError, OSError) as e:
+    st.error(f"Delay model is unavailable: {e}")
+    st.stop()
+
+# Rolling delays from the live feed replay, shared by every session in this process
+@st.cache_resource
+def load_live_tracker():
+    return tracker_from_env()
+
+live_tracker = load_live_tracker()
+
+# A model trained with live delays would silently predict from zeroed live features without the feed
+if live_tracker is None and any(name in features_list for name in LIVE_FEATURES):
+    st.error(f"This delay model uses live delays. Set {LIVE_REPLAY_ENV} to a departure feed to use it.")
+    st.stop()
+
+# Feature encoder with the model's column order resolved once, and recent requests memoized
+@st.cache_resource
+def load_encoder(features):
+    return DelayFeatureEncoder(features)
+
+encoder = load_encoder(tuple(features_list))
+
 # Add custom CSS for responsive title styling
 st.markdown("""
     <style>
@@ -104,58 +123,19 @@ def day_to_number(day):
 def preprocess_features(hour, day, from_id, to_id):
     """Prepare features for model prediction"""
     
-    # Create dictionary with all required model features
-    features = {
-        # Basic time and station features
-        'hour_of_day': hour,
-        'day_of_week': day,
-        'from_id': from_id,
-        'to_id': to_id,
-        'month': pd.Timestamp.now().month,
-        
-        # Derived time-based features
-        'is_weekend': 1 if day in [5, 6] else 0,
-        'is_rush_hour': 1 if hour in [6, 7, 8, 9, 16, 17, 18, 19] else 0,
-        
-        # Initialize all rail line features to 0
-        'line_Atl. City Line': 0,
-        'line_Bergen Co. Line ': 0,
-        'line_Gladstone Branch': 0,
-        'line_Main Line': 0,
-        'line_Montclair-Boonton': 0,
-        'line_Morristown Line': 0,
-        'line_No Jersey Coast': 0,
-        'line_Northeast Corrdr': 0,
-        'line_Pascack Valley': 0,
-        'line_Princeton Shuttle': 0,
-        'line_Raritan Valley': 0,
-        
-        # Set default type and status
-        'type_NJ Transit': 1,
-        'status_cancelled': 0,
-        'status_departed': 1,
-        'status_estimated': 0
-    }
+    # Add live line/station delays; only used if the model was trained with them (checked at load)
+    live = None
+    if live_tracker is not None:
+        live = live_tracker.features([line_for_station(from_id)[len('line_'):]], [from_id])
     
-    # Set appropriate line based on station
-    if from_id in [107, 105, 38187]:  # Major stations
-        features['line_Northeast Corrdr'] = 1
-    elif from_id in [49, 117, 45]:     # Gladstone branch
-        features['line_Gladstone Branch'] = 1
-    else:
-        features['line_Main Line'] = 1  # Default line
-        
-    return features
+    # Same feature definitions as training, packed in the model's column order
+    return encoder.encode(hour, day, from_id, to_id, live=live)
 
 def predict_delay(hour, day, from_id, to_id):
     """Generate delay prediction"""
     
     # Prepare features in correct format
-    features = preprocess_features(hour, day, from_id, to_id)
-    input_data = pd.DataFrame([features])
-    
-    # Ensure features match training data
-    input_data = input_data[features_list]
+    input_data = preprocess_features(hour, day, from_id, to_id)
     
     # Get prediction from model
     return model.predict(input_data)[0]
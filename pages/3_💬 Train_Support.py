@@ -2,9 +2,10 @@ import streamlit as st
 from PIL import Image
 import json
 from datetime import datetime
-import os
 from dotenv import load_dotenv
 import google.generativeai as genai
+from utils.faqs import create_context_from_faqs, read_faqs
+from utils.llm_stub import stub_model_from_env
 
 # Page configuration with updated parameter
 st.set_page_config(
@@ -22,6 +23,11 @@ st.set_page_config(
 # Cache model initialization
 @st.cache_resource
 def initialize_model():
+    # Load tests swap in a local stub for the Gemini API (NJT_STUB_LLM)
+    stub = stub_model_from_env()
+    if stub is not None:
+        return stub
+    
     api_key = st.secrets["GOOGLE_API_KEY"]
     if not api_key:
         raise ValueError("API key not found in Streamlit secrets")
@@ -102,21 +108,8 @@ st.markdown("<hr>", unsafe_allow_html=True)
 
 # Load FAQs data
 def load_faqs():
-    file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'FAQs_-_01042022.json')
     try:
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-        
-        faqs = []
-        for section in data['iOSfaqs']['sections']:
-            section_name = section['sec_name']
-            for qa in section['sec_data']:
-                faqs.append({
-                    'section': section_name,
-                    'question': qa['q'],
-                    'answer': qa['a']
-                })
-        return faqs
+        return read_faqs()
     except FileNotFoundError:
         st.error("FAQ file not found. Please check the file path.")
         return []
@@ -124,14 +117,13 @@ def load_faqs():
         st.error("Error reading FAQ file. Please check the file format.")
         return []
 
-def create_context_from_faqs(faqs):
-    context = "You are an NJ Transit support assistant. Here are the official FAQs you should base your answers on:\n\n"
-    for faq in faqs:
-        context += f"Section: {faq['section']}\n"
-        context += f"Q: {faq['question']}\n"
-        context += f"A: {faq['answer']}\n\n"
-    context += "\nPlease use this information to answer questions. If a question isn't covered in the FAQs, you can provide general help but mention that the information is not from the official FAQs."
-    return context
+# Build the FAQ context once per process instead of once per session
+@st.cache_resource
+def load_faq_context():
+    faqs = load_faqs()
+    if faqs:
+        return faqs, create_context_from_faqs(faqs)
+    return faqs, "You are an NJ Transit support assistant. Please provide general help."
 
 # Additional transit data
 TRANSIT_INFO = """
@@ -190,14 +182,9 @@ def get_chatbot_response(prompt, conversation_history, faqs_context):
 if "messages" not in st.session_state:
     st.session_state.messages = []
 
-if "faqs" not in st.session_state:
-    st.session_state.faqs = load_faqs()
-
-if "faqs_context" not in st.session_state:
-    if st.session_state.faqs:
-        st.session_state.faqs_context = create_context_from_faqs(st.session_state.faqs)
-    else:
-        st.session_state.faqs_context = "You are an NJ Transit support assistant. Please provide general help."
+# FAQs are shared across sessions; session state only keeps references
+if "faqs" not in st.session_state or "faqs_context" not in st.session_state:
+    st.session_state.faqs, st.session_state.faqs_context = load_faq_context()
 
 # Example questions
 st.markdown("""
@@ -0,0 +1 @@
+"""Command-line tools; run them with ``python -m scripts.<name>`` from the repo root."""
@@ -0,0 +1,142 @@
+"""Report memory and predict time of the compact feature encoding at batch scale.
+
+Scores a grid of every hour x day x station pair twice:
+
+* ``legacy``  - the original 22 features as an int64 pandas DataFrame
+* ``compact`` - the pruned features packed into one uint16 NumPy array
+
+For each path the report gives the input matrix size, the peak memory traced
+during encoding and prediction, and the encode and predict times.
+
+It then checks that ``DelayFeatureEncoder`` produces exactly the encoding of
+``encode_matrix(build_feature_frame(...))`` for both schemas, one request and
+one batch at a time, and times single-request encoding with each.
+
+    python -m scripts.bench_features --stations 40 --synthetic
+    python -m scripts.bench_features --legacy-bundle models/legacy.bundle --compact-bundle models/delay_predictor.bundle
+"""
+import argparse
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.delay_features import (BASE_FEATURES, DERIVED_FEATURES, LEGACY_FEATURES, LINE_COLUMNS,
+                                  DelayFeatureEncoder, build_feature_frame, check_encoder_parity, encode_matrix)
+from utils.model_bundle import TreeEnsembleModel, load_bundle, save_bundle
+
+COMPACT_FEATURES = [name for name in BASE_FEATURES if name not in DERIVED_FEATURES] + LINE_COLUMNS
+
+
+def grid(n_stations):
+    """Every (hour, day, from, to) combination for the first ``n_stations`` ids"""
+    stations = np.arange(1, n_stations + 1)
+    hour, day, from_id, to_id = np.meshgrid(np.arange(24), np.arange(7), stations, stations, indexing='ij')
+    return hour.ravel(), day.ravel(), from_id.ravel(), to_id.ravel()
+
+
+def synthetic_model(features, n_estimators=200, max_depth=7):
+    """Fit a gradient boosting model on random rows and return its bundle evaluator"""
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    rng = np.random.default_rng(42)
+    n = 20000
+    frame = build_feature_frame(rng.integers(0, 24, n), rng.integers(0, 7, n),
+                                rng.integers(1, 200, n), rng.integers(1, 200, n), rng.integers(1, 13, n))
+    X = encode_matrix(frame, features)
+    y = rng.gamma(2.0, 2.0, size=n) + (frame['is_rush_hour'].to_numpy() * 2)
+    model = GradientBoostingRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=42).fit(X, y)
+    with tempfile.TemporaryDirectory() as bundle_dir:
+        save_bundle(bundle_dir, model, features)
+        bundled, _ = load_bundle(bundle_dir)
+        # Copy out of the mapping so the bundle directory can be removed
+        arrays = {name: np.array(getattr(bundled, name)) for name in ('roots', 'left', 'right', 'feature', 'threshold', 'value')}
+    return TreeEnsembleModel(arrays, bundled.base, bundled.scale, bundled.max_depth, features)
+
+
+def measure(name, encode, model):
+    """Run encode + predict under tracemalloc and return a report row"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    X = encode()
+    encoded = time.perf_counter()
+    predictions = model.predict(X)
+    done = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    nbytes = X.memory_usage(index=False).sum() if hasattr(X, 'memory_usage') else X.nbytes
+    return {
+        'path': name,
+        'columns': X.shape[1],
+        'matrix_mb': nbytes / 1e6,
+        'peak_mb': peak / 1e6,
+        'encode_s': encoded - start,
+        'predict_s': done - encoded,
+        'rows_per_s': len(predictions) / (done - start),
+    }
+
+
+def time_single_requests(features, n=2000):
+    """Mean seconds per single-request encode for the DataFrame path and the encoder"""
+    rng = np.random.default_rng(1)
+    requests = list(zip(rng.integers(0, 24, n).tolist(), rng.integers(0, 7, n).tolist(),
+                        rng.choice([107, 105, 49, 1, 148], n).tolist(), rng.choice([105, 148], n).tolist()))
+    start = time.perf_counter()
+    for hour, day, from_id, to_id in requests:
+        encode_matrix(build_feature_frame(hour, day, from_id, to_id), features)
+    frame_s = (time.perf_counter() - start) / n
+    encoder = DelayFeatureEncoder(features)
+    start = time.perf_counter()
+    for hour, day, from_id, to_id in requests:
+        encoder.encode(hour, day, from_id, to_id)
+    encoder_s = (time.perf_counter() - start) / n
+    return frame_s, encoder_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and compact feature encodings")
+    parser.add_argument('--stations', type=int, default=40, help="Stations in the grid (rows = 168 * stations^2)")
+    parser.add_argument('--synthetic', action='store_true', help="Fit synthetic models for both schemas")
+    parser.add_argument('--legacy-bundle', help="Bundle trained on the 22 legacy features")
+    parser.add_argument('--compact-bundle', help="Bundle trained on the compact features")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        legacy_model, compact_model = synthetic_model(LEGACY_FEATURES), synthetic_model(COMPACT_FEATURES)
+        compact_features = COMPACT_FEATURES
+    elif args.legacy_bundle and args.compact_bundle:
+        legacy_model, _ = load_bundle(args.legacy_bundle, expected_features=LEGACY_FEATURES)
+        compact_model, manifest = load_bundle(args.compact_bundle)
+        compact_features = manifest['feature_schema']
+    else:
+        raise SystemExit("Pass --synthetic or both --legacy-bundle and --compact-bundle")
+
+    hour, day, from_id, to_id = grid(args.stations)
+    print(f"Scoring {len(hour):,} rows")
+
+    def encode_legacy():
+        return build_feature_frame(hour, day, from_id, to_id).astype(np.int64)[LEGACY_FEATURES]
+
+    def encode_compact():
+        return encode_matrix(build_feature_frame(hour, day, from_id, to_id), compact_features)
+
+    rows = [measure('legacy', encode_legacy, legacy_model), measure('compact', encode_compact, compact_model)]
+    print(f"{'path':<8} {'cols':>4} {'matrix MB':>10} {'peak MB':>9} {'encode s':>9} {'predict s':>10} {'rows/s':>11}")
+    for row in rows:
+        print(f"{row['path']:<8} {row['columns']:>4} {row['matrix_mb']:>10.1f} {row['peak_mb']:>9.1f} "
+              f"{row['encode_s']:>9.3f} {row['predict_s']:>10.3f} {row['rows_per_s']:>11,.0f}")
+    legacy, compact = rows
+    print(f"Matrix {legacy['matrix_mb'] / compact['matrix_mb']:.1f}x smaller, "
+          f"peak memory {legacy['peak_mb'] / compact['peak_mb']:.1f}x lower, "
+          f"end to end {compact['rows_per_s'] / legacy['rows_per_s']:.2f}x faster")
+
+    for name, features in (('legacy', LEGACY_FEATURES), ('compact', compact_features)):
+        checked = check_encoder_parity(features, min(args.stations, 20))
+        frame_s, encoder_s = time_single_requests(features)
+        print(f"{name:<8} encoder matches on {checked:,} rows; single request "
+              f"{frame_s * 1e6:,.0f}us -> {encoder_s * 1e6:,.1f}us ({frame_s / encoder_s:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
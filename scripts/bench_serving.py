@@ -0,0 +1,146 @@
+"""Benchmark per-worker memory and throughput for shared vs private model loading.
+
+For each worker count from 1 to N, fork that many processes. Each worker
+either maps the shared serving store (``shared``) or loads and fits its own
+copies the way a plain Streamlit process does (``private``). It then runs
+single-row delay predictions for a fixed time. The report shows memory
+growth per worker (RSS and USS, the unique set size) and the aggregate
+predictions per second.
+
+    python -m scripts.bench_serving --workers 4 --seconds 3 --synthetic
+"""
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from utils.model_bundle import TreeEnsembleModel, load_delay_model, save_bundle
+from utils.shared_store import SharedStore, build_serving_store
+
+
+def memory_kb(pid='self'):
+    """Return (rss_kb, uss_kb) for a process (the current one by default) from /proc"""
+    rss = uss = 0
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as file:
+        for line in file:
+            key, _, rest = line.partition(':')
+            if key == 'Rss':
+                rss = int(rest.split()[0])
+            elif key in ('Private_Clean', 'Private_Dirty'):
+                uss += int(rest.split()[0])
+    return rss, uss
+
+
+def make_synthetic_bundle(model_dir, n_features=25, n_estimators=200, max_depth=7):
+    """Fit a gradient boosting model shaped like the delay predictor and bundle it"""
+    from sklearn.ensemble import GradientBoostingRegressor
+
+    rng = np.random.default_rng(42)
+    X = rng.integers(0, 40000, size=(20000, n_features)).astype(np.float64)
+    y = rng.gamma(2.0, 2.0, size=X.shape[0])
+    model = GradientBoostingRegressor(n_estimators=n_estimators, max_depth=max_depth, random_state=42)
+    model.fit(X, y)
+    features = [f'feature_{i}' for i in range(n_features)]
+    save_bundle(os.path.join(model_dir, 'delay_predictor.bundle'), model, features, {'MAE': 0.0, 'RMSE': 0.0})
+
+
+def load_private(model_dir):
+    """Load everything into process-private memory, as each Streamlit process does"""
+    from utils import cancellations
+    from utils.rail_data import load_rail_dataset
+
+    model, _, _ = load_delay_model(model_dir)
+    if isinstance(model, TreeEnsembleModel):
+        arrays = {name: np.array(getattr(model, name)) for name in ('roots', 'left', 'right', 'feature', 'threshold', 'value')}
+        model = TreeEnsembleModel(arrays, model.base, model.scale, model.max_depth, list(model.feature_names_in_))
+    data = load_rail_dataset()
+    tables = cancellations.month_prediction_table(data)
+    return model, tables
+
+
+def load_shared(store_dir):
+    """Map the shared store; nothing is copied into the worker"""
+    store = SharedStore(store_dir)
+    model, _, _ = store.delay_model()
+    return model, store
+
+
+def worker(mode, store_dir, model_dir, seconds, barrier, results):
+    rss_start, uss_start = memory_kb()
+    if mode == 'shared':
+        model, keep = load_shared(store_dir)
+    else:
+        model, keep = load_private(model_dir)
+
+    rng = np.random.default_rng(os.getpid())
+    rows = rng.integers(0, 40000, size=(256, model.n_features_in_)).astype(np.float32)
+
+    barrier.wait()
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        model.predict(rows[count % len(rows)][None, :])
+        count += 1
+
+    rss_end, uss_end = memory_kb()
+    results.put((rss_end - rss_start, uss_end - uss_start, count / seconds))
+
+
+def run(mode, n_workers, store_dir, model_dir, seconds):
+    ctx = mp.get_context('fork')
+    barrier = ctx.Barrier(n_workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(mode, store_dir, model_dir, seconds, barrier, results))
+        for _ in range(n_workers)
+    ]
+    for proc in procs:
+        proc.start()
+    stats = [results.get() for _ in procs]
+    for proc in procs:
+        proc.join()
+    rss = np.mean([s[0] for s in stats])
+    uss = np.mean([s[1] for s in stats])
+    throughput = sum(s[2] for s in stats)
+    return rss, uss, throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark shared-memory serving")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Maximum number of workers")
+    parser.add_argument('--seconds', type=float, default=3.0, help="Prediction time per run")
+    parser.add_argument('--modes', nargs='+', default=['private', 'shared'], choices=['private', 'shared'])
+    parser.add_argument('--model-dir', default=os.path.join(os.path.dirname(__file__), '..', 'models'))
+    parser.add_argument('--synthetic', action='store_true',
+                        help="Use a synthetic model shaped like the delay predictor (no LFS pull needed)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='njt-bench-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    try:
+        model_dir = args.model_dir
+        if args.synthetic:
+            model_dir = os.path.join(work_dir, 'models')
+            make_synthetic_bundle(model_dir)
+        store_dir = os.path.join(work_dir, 'store')
+        build_serving_store(store_dir, model_dir=model_dir)
+        if not SharedStore(store_dir).has_delay_model():
+            raise SystemExit("The delay model must be a tree ensemble bundle; convert it or pass --synthetic")
+
+        print(f"{'mode':<8} {'workers':>7} {'RSS/worker MB':>14} {'USS/worker MB':>14} {'pred/s':>10} {'scaling':>8}")
+        for mode in args.modes:
+            single = None
+            for n in range(1, args.workers + 1):
+                rss, uss, throughput = run(mode, n, store_dir, model_dir, args.seconds)
+                single = single or throughput
+                print(f"{mode:<8} {n:>7} {rss / 1024:>14.1f} {uss / 1024:>14.1f} "
+                      f"{throughput:>10.0f} {throughput / (n * single):>8.2f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
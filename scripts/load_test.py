@@ -0,0 +1,316 @@
+"""Load test one Streamlit instance of the app with concurrent headless sessions.
+
+Starts ``streamlit run ON_NJ_Transit.py``. The support chat's Gemini model is
+replaced by a local stub (``NJT_STUB_LLM``) that answers after
+``--llm-latency`` ms. The harness then opens N websocket sessions, and each
+one loops through the rider flows:
+
+* ``delay``  - open the Train Delay page and predict for two random stations
+* ``cancel`` - open the Mechanical Cancellations page and switch to a random month
+* ``chat``   - open the Train Support page and ask a random FAQ question
+
+Every step is one script run, timed from the rerun request to the server's
+script-finished message. For each session count the report shows script runs
+per second, latency percentiles per step, errors, and the server's memory
+growth per open session (RSS and USS, the unique set size).
+
+The client speaks Streamlit's websocket protocol directly. Widget values are
+encoded the way the browser sends them for the installed Streamlit release.
+
+    python -m scripts.load_test --sessions 1 10 25 --seconds 30 --synthetic
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from collections import Counter, defaultdict
+
+import numpy as np
+import websockets
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from scripts.bench_serving import make_synthetic_bundle, memory_kb
+from utils.faqs import read_faqs
+from utils.llm_stub import STUB_LLM_ENV
+from utils.shared_store import SHARED_DIR_ENV, build_serving_store
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+MAIN_SCRIPT = 'ON_NJ_Transit.py'
+
+# Flow name -> word in the page name it opens
+FLOWS = {'delay': 'delay', 'cancel': 'cancellation', 'chat': 'support'}
+
+
+class Stats:
+    """Latencies and errors per step for one load level"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+        self.messages = []
+
+    def record(self, step, seconds):
+        self.latencies[step].append(seconds)
+
+    def fail(self, step, error):
+        self.errors[step] += 1
+        if len(self.messages) < 5:
+            self.messages.append(f"{step}: {type(error).__name__}: {error}")
+
+
+class PageError(RuntimeError):
+    """The script run finished but the page showed an exception"""
+
+
+class Session:
+    """One headless browser tab: sends reruns and waits for each to finish"""
+
+    def __init__(self, url, timeout):
+        self.url = url
+        self.timeout = timeout
+        self.pages = {}
+        self.websocket = None
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, subprotocols=['streamlit'], max_size=None,
+                                                  open_timeout=self.timeout)
+
+    async def close(self):
+        if self.websocket is not None:
+            await self.websocket.close()
+
+    def page(self, flow):
+        """Return the page script hash for a flow's page"""
+        for name, page_hash in self.pages.items():
+            if FLOWS[flow] in name.lower():
+                return page_hash
+        raise LookupError(f"No page matching {FLOWS[flow]!r} in {sorted(self.pages)}")
+
+    async def run(self, page_hash='', widgets=()):
+        """Rerun the script and return the elements it drew once it finishes"""
+        msg = BackMsg()
+        msg.rerun_script.page_script_hash = page_hash
+        msg.rerun_script.widget_states.widgets.extend(widgets)
+        await self.websocket.send(msg.SerializeToString())
+
+        elements = []
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(await asyncio.wait_for(self.websocket.recv(), self.timeout))
+            kind = forward.WhichOneof('type')
+            if kind == 'navigation':
+                self.pages = {page.page_name: page.page_script_hash for page in forward.navigation.app_pages}
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                elements.append(forward.delta.new_element)
+            elif kind == 'script_finished':
+                if forward.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    # The page called st.rerun(); wait for the run it started
+                    elements = []
+                    continue
+                if forward.script_finished == ForwardMsg.FINISHED_WITH_COMPILE_ERROR:
+                    raise PageError("script failed to compile")
+                break
+
+        exceptions = [element.exception for element in elements if element.WhichOneof('type') == 'exception']
+        if exceptions:
+            raise PageError(f"{exceptions[0].type}: {exceptions[0].message}")
+        return elements
+
+
+def find_widget(elements, kind, label=None):
+    for element in elements:
+        if element.WhichOneof('type') == kind:
+            widget = getattr(element, kind)
+            if label is None or widget.label == label:
+                return widget
+    raise LookupError(f"No {kind} {label or ''} on the page")
+
+
+async def timed(stats, step, session, page_hash, widgets=()):
+    start = time.perf_counter()
+    elements = await session.run(page_hash, widgets)
+    stats.record(step, time.perf_counter() - start)
+    return elements
+
+
+async def delay_flow(session, rng, stats, questions):
+    page_hash = session.page('delay')
+    elements = await timed(stats, 'delay:open', session, page_hash)
+    from_box = find_widget(elements, 'selectbox', 'From Station')
+    to_box = find_widget(elements, 'selectbox', 'To Station')
+    button = find_widget(elements, 'button', 'Predict Delay')
+    from_station, to_station = rng.sample(list(from_box.options), 2)
+    await timed(stats, 'delay:predict', session, page_hash, [
+        WidgetState(id=from_box.id, string_value=from_station),
+        WidgetState(id=to_box.id, string_value=to_station),
+        WidgetState(id=button.id, trigger_value=True),
+    ])
+
+
+async def cancel_flow(session, rng, stats, questions):
+    page_hash = session.page('cancel')
+    elements = await timed(stats, 'cancel:open', session, page_hash)
+    month_box = find_widget(elements, 'selectbox', 'Select month for prediction')
+    month = rng.choice(list(month_box.options))
+    await timed(stats, 'cancel:month', session, page_hash, [WidgetState(id=month_box.id, string_value=month)])
+
+
+async def chat_flow(session, rng, stats, questions):
+    page_hash = session.page('chat')
+    elements = await timed(stats, 'chat:open', session, page_hash)
+    chat_input = find_widget(elements, 'chat_input')
+    state = WidgetState(id=chat_input.id)
+    state.chat_input_value.data = rng.choice(questions)
+    await timed(stats, 'chat:ask', session, page_hash, [state])
+
+
+FLOW_RUNNERS = {'delay': delay_flow, 'cancel': cancel_flow, 'chat': chat_flow}
+
+
+async def drive(url, flows, deadline, args, seed, stats, questions):
+    """Run one session's flows until the deadline (at least once) and return it still open"""
+    session = Session(url, args.timeout)
+    try:
+        await session.connect()
+        await timed(stats, 'home', session, '')
+    except (OSError, asyncio.TimeoutError, websockets.WebSocketException, PageError) as e:
+        stats.fail('connect', e)
+        await session.close()
+        return None
+
+    rng = random.Random(seed)
+    while True:
+        for flow in flows:
+            try:
+                await FLOW_RUNNERS[flow](session, rng, stats, questions)
+            except (LookupError, PageError) as e:
+                stats.fail(flow, e)
+            except (asyncio.TimeoutError, websockets.WebSocketException) as e:
+                # Late messages from this run would be misread by the next one
+                stats.fail(flow, e)
+                await session.close()
+                return None
+            if args.think_time:
+                await asyncio.sleep(rng.expovariate(1000 / args.think_time))
+        if time.perf_counter() >= deadline:
+            return session
+
+
+async def run_load(url, n_sessions, seconds, args, questions, server_pid):
+    """Drive ``n_sessions`` concurrent sessions and return (stats, elapsed, rss_kb, uss_kb) per session"""
+    stats = Stats()
+    rss_start, uss_start = memory_kb(server_pid)
+    start = time.perf_counter()
+    sessions = await asyncio.gather(*(
+        drive(url, args.flows, start + seconds, args, seed, stats, questions) for seed in range(n_sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    # Measure while every session is still connected
+    rss_end, uss_end = memory_kb(server_pid)
+    for session in sessions:
+        if session is not None:
+            await session.close()
+    return stats, elapsed, (rss_end - rss_start) / n_sessions, (uss_end - uss_start) / n_sessions
+
+
+def start_server(port, env, log_file):
+    command = [
+        sys.executable, '-m', 'streamlit', 'run', MAIN_SCRIPT,
+        '--server.headless', 'true',
+        '--server.address', '127.0.0.1',
+        '--server.port', str(port),
+        '--server.fileWatcherType', 'none',
+        '--browser.gatherUsageStats', 'false',
+    ]
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+
+def wait_for_server(server, port, log_path, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server.poll() is not None:
+            with open(log_path, 'r') as file:
+                raise SystemExit(f"Streamlit exited with code {server.returncode}:\n{file.read()[-2000:]}")
+        try:
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1) as response:
+                if response.status == 200:
+                    return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise SystemExit(f"Streamlit did not become healthy within {timeout}s; see {log_path}")
+
+
+def report(n_sessions, stats, elapsed, rss_kb, uss_kb):
+    runs = sum(len(values) for values in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    print(f"\n{n_sessions} sessions: {runs:,} script runs in {elapsed:.1f}s ({runs / elapsed:,.1f} runs/s), "
+          f"{errors} errors, server memory per session {rss_kb / 1024:+.2f} MB RSS / {uss_kb / 1024:+.2f} MB USS")
+    print(f"  {'step':<14} {'runs':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>6}")
+    for step in sorted(set(stats.latencies) | set(stats.errors)):
+        values = stats.latencies.get(step)
+        if values:
+            p50, p95, p99, worst = np.percentile(values, [50, 95, 99, 100]) * 1000
+            timings = f"{p50:>8.0f} {p95:>8.0f} {p99:>8.0f} {worst:>8.0f}"
+        else:
+            timings = f"{'-':>8} {'-':>8} {'-':>8} {'-':>8}"
+        print(f"  {step:<14} {len(values or []):>6} {timings} {stats.errors[step]:>6}")
+    for message in stats.messages:
+        print(f"  ! {message}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the Streamlit app with concurrent sessions")
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 5, 10], help="Concurrent session counts to run")
+    parser.add_argument('--seconds', type=float, default=20.0, help="Duration of each load level")
+    parser.add_argument('--flows', nargs='+', default=list(FLOWS), choices=list(FLOWS))
+    parser.add_argument('--llm-latency', type=float, default=500, help="Stub LLM latency per message, in ms")
+    parser.add_argument('--think-time', type=float, default=0, help="Mean pause between flows, in ms")
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for one script run")
+    parser.add_argument('--port', type=int, default=8599)
+    parser.add_argument('--synthetic', action='store_true',
+                        help="Serve a synthetic delay model through a shared store (no LFS pull needed)")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='njt-load-')
+    env = dict(os.environ, **{STUB_LLM_ENV: str(args.llm_latency)})
+    if args.synthetic:
+        model_dir = os.path.join(work_dir, 'models')
+        make_synthetic_bundle(model_dir)
+        env[SHARED_DIR_ENV] = build_serving_store(os.path.join(work_dir, 'store'), model_dir=model_dir)
+
+    log_path = os.path.join(work_dir, 'streamlit.log')
+    with open(log_path, 'w') as log_file:
+        server = start_server(args.port, env, log_file)
+    try:
+        wait_for_server(server, args.port, log_path)
+        url = f'ws://127.0.0.1:{args.port}/_stcore/stream'
+        questions = [faq['question'] for faq in read_faqs()]
+
+        # One pass through every flow loads the models and fills the caches before measuring
+        stats, _, _, _ = asyncio.run(run_load(url, 1, 0, args, questions, server.pid))
+        if stats.errors:
+            report(1, stats, 1, 0, 0)
+            raise SystemExit("Warm-up failed; fix the errors above or pass --synthetic")
+
+        for n_sessions in args.sessions:
+            report(n_sessions, *asyncio.run(run_load(url, n_sessions, args.seconds, args, questions, server.pid)))
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
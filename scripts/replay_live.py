@@ -0,0 +1,105 @@
+"""Replay a departure feed into the live delay tracker and measure freshness.
+
+A producer thread releases events from a ``data.csv``-style file, either as
+fast as possible or at ``--speedup`` x real time. A consumer thread applies
+them to a ``LiveDelayTracker``. The main thread issues a prediction with live
+features every ``--predict-interval`` milliseconds. The report shows ingest
+throughput (events/sec), predict latency, and end-to-end freshness: the time
+from an event's release to the first prediction computed after it was applied.
+
+    python -m scripts.replay_live data/data.csv --speedup 0 --bundle models/delay_predictor.bundle
+"""
+import argparse
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from utils.delay_features import DelayFeatureEncoder, line_for_station
+from utils.live_delays import LIVE_FEATURES, LiveDelayTracker, paced, replay_events
+from utils.model_bundle import load_delay_model
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+DONE = object()
+
+
+def percentiles(values):
+    if not values:
+        return 'n/a'
+    p50, p99, worst = np.percentile(values, [50, 99, 100]) * 1000
+    return f"p50 {p50:.2f}ms  p99 {p99:.2f}ms  max {worst:.2f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure live delay feature throughput and freshness")
+    parser.add_argument('events', help="Departures CSV in the data.csv schema")
+    parser.add_argument('--speedup', type=float, default=0, help="Replay speed vs real time (0 = as fast as possible)")
+    parser.add_argument('--window', type=int, default=20, help="Ring buffer size per line/station")
+    parser.add_argument('--predict-interval', type=float, default=5, help="Milliseconds between predictions")
+    parser.add_argument('--model-dir', default=os.path.join(ROOT_DIR, 'models'))
+    parser.add_argument('--bundle', help="Predict with this model bundle instead of the models directory")
+    args = parser.parse_args()
+
+    model, features_list, _ = load_delay_model(args.model_dir, args.bundle)
+    if not set(LIVE_FEATURES) <= set(features_list):
+        print("Note: the model was not trained with live features; they are computed but ignored")
+
+    encoder = DelayFeatureEncoder(features_list)
+    tracker = LiveDelayTracker(args.window)
+    events = queue.Queue(maxsize=10_000)
+    pending = []            # release times of applied events not yet seen by a prediction
+    pending_lock = threading.Lock()
+    stats = {'events': 0}
+
+    def produce():
+        for emitted_at, event in paced(replay_events(args.events), args.speedup):
+            events.put((emitted_at, event))
+        events.put(DONE)
+
+    def consume():
+        start = time.perf_counter()
+        while True:
+            item = events.get()
+            if item is DONE:
+                break
+            emitted_at, (line, station_id, delay, event_time) = item
+            tracker.update(line, station_id, delay, event_time)
+            with pending_lock:
+                pending.append(emitted_at)
+            stats['events'] += 1
+            stats['last'] = (line, station_id, event_time)
+        stats['ingest_s'] = time.perf_counter() - start
+
+    threads = [threading.Thread(target=produce, daemon=True), threading.Thread(target=consume, daemon=True)]
+    for thread in threads:
+        thread.start()
+
+    latencies, freshness = [], []
+    while threads[1].is_alive() or pending:
+        time.sleep(args.predict_interval / 1000)
+        if 'last' not in stats:
+            continue
+        with pending_lock:
+            batch = pending[:]
+            pending.clear()
+
+        # Ask about a departure from the station that just reported
+        _, station_id, event_time = stats['last']
+        start = time.perf_counter()
+        live = tracker.features([line_for_station(station_id)[len('line_'):]], [station_id])
+        model.predict(encoder.encode(event_time.hour, event_time.dayofweek, station_id, 105, event_time.month, live))
+        done = time.perf_counter()
+
+        latencies.append(done - start)
+        freshness.extend(done - emitted_at for emitted_at in batch)
+
+    print(f"Events:      {stats['events']:,} in {stats['ingest_s']:.2f}s "
+          f"({stats['events'] / stats['ingest_s']:,.0f} events/s)")
+    print(f"Predictions: {len(latencies):,}  latency {percentiles(latencies)}")
+    print(f"Freshness:   {percentiles(freshness)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Score a full timetable with the delay model, without the Streamlit page.
+
+Reads a CSV or Parquet timetable with one row per stop pair, at least
+``train_id, from_id, to_id, scheduled_time``, in fixed-size chunks. Each chunk
+is encoded with the shared feature encoder and scored by a pool of worker
+processes. Every worker maps the same model bundle read-only. Results are
+written to Parquet in input order with a ``predicted_delay_minutes`` column
+added. Station ids are read as nullable integers and every chunk is cast to
+the first chunk's schema, so a blank id in a later chunk can't change the
+column types. The output only appears once every chunk has been written.
+
+    python -m scripts.score_timetable timetable.csv predictions.parquet --workers 8
+"""
+import argparse
+import os
+import time
+from collections import deque
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from utils.delay_features import DelayFeatureEncoder
+from utils.model_bundle import load_delay_model
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+PREDICTION_COLUMN = 'predicted_delay_minutes'
+
+# Set once per worker process by _init_worker
+_model = None
+_encoder = None
+
+
+def _init_worker(model_dir, bundle):
+    global _model, _encoder
+    _model, features, _ = load_delay_model(model_dir, bundle)
+    _encoder = DelayFeatureEncoder(features)
+
+
+def score_chunk(hour, day, month, from_id, to_id):
+    """Encode and score one chunk in the current process"""
+    return _model.predict(_encoder.encode_batch(hour, day, from_id, to_id, month)).astype(np.float32)
+
+
+def read_chunks(path, chunk_size, columns, dtype=None):
+    """Yield DataFrame chunks of a CSV or Parquet file"""
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, dtype=dtype,
+                               usecols=lambda c: columns is None or c in columns)
+
+
+def chunk_inputs(chunk, args):
+    """Extract the model inputs from a timetable chunk"""
+    scheduled = pd.to_datetime(chunk[args.time_col], errors='coerce')
+    if scheduled.isna().any():
+        raise ValueError(f"{int(scheduled.isna().sum())} rows have an unparseable {args.time_col}")
+    return (
+        scheduled.dt.hour.to_numpy(),
+        scheduled.dt.dayofweek.to_numpy(),
+        scheduled.dt.month.to_numpy(),
+        chunk[args.from_col].to_numpy(dtype=np.float64, na_value=np.nan),
+        chunk[args.to_col].to_numpy(dtype=np.float64, na_value=np.nan),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write delay predictions for a timetable")
+    parser.add_argument('input', help="Timetable CSV or Parquet file")
+    parser.add_argument('output', help="Output Parquet file")
+    parser.add_argument('--model-dir', default=os.path.join(ROOT_DIR, 'models'))
+    parser.add_argument('--bundle', help="Score with this model bundle instead of the models directory")
+    parser.add_argument('--chunk-size', type=int, default=100_000, help="Rows per chunk")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Scoring processes")
+    parser.add_argument('--train-col', default='train_id')
+    parser.add_argument('--from-col', default='from_id')
+    parser.add_argument('--to-col', default='to_id')
+    parser.add_argument('--time-col', default='scheduled_time')
+    parser.add_argument('--all-columns', action='store_true', help="Copy every input column, not just the key columns")
+    args = parser.parse_args()
+
+    columns = None if args.all_columns else [args.train_col, args.from_col, args.to_col, args.time_col]
+    # CSV chunks infer their own dtypes; pin the key columns so a blank id doesn't turn them into floats
+    dtype = {args.train_col: str, args.from_col: 'Int64', args.to_col: 'Int64'}
+    partial_path = args.output + '.partial'
+    start = time.perf_counter()
+    rows = 0
+    writer = None
+
+    def write(chunk, predictions):
+        nonlocal writer, rows
+        chunk = chunk[columns] if columns else chunk
+        table = pa.Table.from_pandas(chunk.assign(**{PREDICTION_COLUMN: predictions}), preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(partial_path, table.schema)
+        else:
+            table = table.cast(writer.schema)
+        writer.write_table(table)
+        rows += len(chunk)
+
+    try:
+        if args.workers <= 1:
+            _init_worker(args.model_dir, args.bundle)
+            for chunk in read_chunks(args.input, args.chunk_size, columns, dtype):
+                write(chunk, score_chunk(*chunk_inputs(chunk, args)))
+        else:
+            # Keep a bounded number of chunks in flight so memory stays flat on large files
+            with get_context().Pool(args.workers, initializer=_init_worker,
+                                    initargs=(args.model_dir, args.bundle)) as pool:
+                pending = deque()
+                for chunk in read_chunks(args.input, args.chunk_size, columns, dtype):
+                    pending.append((chunk, pool.apply_async(score_chunk, chunk_inputs(chunk, args))))
+                    if len(pending) >= 2 * args.workers:
+                        chunk, result = pending.popleft()
+                        write(chunk, result.get())
+                while pending:
+                    chunk, result = pending.popleft()
+                    write(chunk, result.get())
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    if writer is not None:
+        writer.close()
+        os.replace(partial_path, args.output)
+
+    elapsed = time.perf_counter() - start
+    print(f"Scored {rows:,} rows in {elapsed:.1f}s ({rows / elapsed:,.0f} rows/s) -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Run several Streamlit workers that share one read-only serving store.
+
+The parent builds the store (delay model arrays and cancellation tables) on
+a tmpfs such as /dev/shm. It then starts one Streamlit process per port with
+``NJT_SHARED_DIR`` set. Workers map the store instead of loading their own
+copies. Each worker still reads the small FAQ file itself. Put a load
+balancer in front of the ports.
+
+    python -m scripts.serve --workers 4 --base-port 8501
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from utils.shared_store import SHARED_DIR_ENV, build_serving_store
+
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+
+
+def default_store_dir():
+    """Prefer shared memory so mapped pages never hit disk"""
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, f'njt-serving-{os.getpid()}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the app from several processes sharing model memory")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Number of Streamlit processes")
+    parser.add_argument('--base-port', type=int, default=8501, help="Port of the first worker")
+    parser.add_argument('--store-dir', help="Where to write the shared store (default: /dev/shm)")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or default_store_dir()
+    build_serving_store(store_dir)
+    print(f"Shared store ready at {store_dir}")
+
+    env = dict(os.environ, **{SHARED_DIR_ENV: store_dir})
+    workers = []
+    try:
+        for i in range(args.workers):
+            port = args.base_port + i
+            workers.append(subprocess.Popen(
+                [sys.executable, '-m', 'streamlit', 'run', 'ON_NJ_Transit.py',
+                 '--server.port', str(port), '--server.headless', 'true'],
+                cwd=ROOT_DIR,
+                env=env,
+            ))
+            print(f"Worker {i} listening on port {port}")
+        for worker in workers:
+            worker.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+        if not args.store_dir:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
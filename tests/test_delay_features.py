@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from utils.delay_features import (BASE_FEATURES, DERIVED_FEATURES, LEGACY_FEATURES, LINE_COLUMNS,
+                                  DelayFeatureEncoder, build_feature_frame, check_encoder_parity, encode_matrix)
+from utils.live_delays import LIVE_FEATURES
+
+COMPACT_FEATURES = [name for name in BASE_FEATURES if name not in DERIVED_FEATURES] + LINE_COLUMNS
+
+SCHEMAS = {
+    'legacy': LEGACY_FEATURES,
+    'compact': COMPACT_FEATURES,
+    'compact_live': COMPACT_FEATURES + LIVE_FEATURES,
+    # A model that never saw most lines, with columns in a different order
+    'partial': ['to_id', 'line_Main Line', 'hour_of_day', 'from_id', 'line_Northeast Corrdr', 'day_of_week'],
+}
+
+
+@pytest.mark.parametrize('schema', list(SCHEMAS))
+def test_encoder_matches_encode_matrix(schema):
+    assert check_encoder_parity(SCHEMAS[schema], n_stations=5) > 0
+
+
+def test_cache_is_bounded():
+    encoder = DelayFeatureEncoder(COMPACT_FEATURES, cache_size=8)
+    for from_id in range(1, 50):
+        encoder.encode(8, 1, from_id, 105, 6)
+    assert len(encoder._cache) == 8
+
+
+def test_live_values_do_not_leak_into_the_next_request():
+    features = COMPACT_FEATURES + LIVE_FEATURES
+    encoder = DelayFeatureEncoder(features)
+    live = {name: np.array([7.5], dtype=np.float32) for name in LIVE_FEATURES}
+    encoder.encode(8, 1, 107, 105, 6, live=live)
+
+    row = encoder.encode(8, 1, 107, 105, 6)
+    expected = encode_matrix(build_feature_frame(8, 1, 107, 105, 6), features)
+    np.testing.assert_array_equal(row, expected)
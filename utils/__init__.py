@@ -0,0 +1 @@
+"""Shared helpers for the NJ Transit Streamlit pages, notebooks and scripts."""
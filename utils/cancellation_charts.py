@@ -0,0 +1,182 @@
+"""Charts for the Mechanical Cancellations page, cached once per process.
+
+Every chart except the month prediction chart depends only on the dataset,
+so each is built once per dataset version and shared by all sessions. The
+prediction chart is cached per month. The dataset version is re-checked on
+every call (it only stats the source files), so a rebuilt dataset is picked
+up without a restart. ``start_chart_warmup`` renders all of the charts,
+including the 12 month variants, in a background thread.
+"""
+import calendar
+import threading
+from functools import lru_cache
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from utils.cancellations import feature_importance, fit_cancellation_model, month_prediction_table
+from utils.figure_cache import FigureCache
+from utils.rail_data import dataset_version, load_rail_dataset
+from utils.shared_store import open_shared_store
+
+STATIC_CHARTS = ['heatmap', 'trend', 'box', 'importance']
+
+_figures = FigureCache(maxsize=32)
+_inputs = None
+_inputs_lock = threading.Lock()
+
+
+def show_feature_importance(importance_df):
+    fig = px.bar(importance_df,
+                 x='Feature',
+                 y='Importance',
+                 title='Feature Importance for Prediction Model')
+    return fig
+
+
+def create_monthly_heatmap(df):
+    # Pivot data for heatmap
+    heatmap_data = df.pivot_table(
+        values='CANCEL_PERCENTAGE',
+        index='YEAR',
+        columns='MONTH_NUM',
+        aggfunc='mean'
+    ).round(1)
+
+    # Create heatmap
+    fig = go.Figure(data=go.Heatmap(
+        z=heatmap_data.values,
+        x=[calendar.month_abbr[i] for i in range(1, 13)],
+        y=heatmap_data.index,
+        colorscale='RdYlBu_r',
+        text=np.round(heatmap_data.values, 1),
+        texttemplate='%{text}%',
+        textfont={"size": 10},
+        colorbar=dict(title='Cancellation Rate (%)')
+    ))
+
+    fig.update_layout(
+        title='Monthly Mechanical Cancellation Rates Heatmap',
+        xaxis_title='Month',
+        yaxis_title='Year'
+    )
+
+    return fig
+
+
+def create_trend_chart(df):
+    # Historical trend with trend line
+    fig_trend = px.scatter(df,
+                          x='DATE',
+                          y='CANCEL_PERCENTAGE',
+                          trendline="lowess",
+                          title='Historical Mechanical Cancellation Trend',
+                          labels={'CANCEL_PERCENTAGE': 'Cancellation Rate (%)',
+                                 'DATE': 'Date'})
+
+    fig_trend.update_traces(marker=dict(size=8))
+    return fig_trend
+
+
+def create_monthly_box_plot(df):
+    fig_box = px.box(df,
+                     x='MONTH',
+                     y='CANCEL_PERCENTAGE',
+                     title='Monthly Distribution of Mechanical Cancellations',
+                     labels={'CANCEL_PERCENTAGE': 'Cancellation Rate (%)',
+                            'MONTH': 'Month'})
+    return fig_box
+
+
+def create_prediction_chart(df, month, future_dates, predictions):
+    fig_predict = go.Figure()
+
+    # Historical data for selected month
+    historical_data = df[df['MONTH_NUM'] == month]
+    fig_predict.add_trace(go.Scatter(
+        x=historical_data['YEAR'],
+        y=historical_data['CANCEL_PERCENTAGE'],
+        name='Historical Data',
+        mode='markers+lines',
+        marker=dict(size=8)
+    ))
+
+    # Predictions
+    fig_predict.add_trace(go.Scatter(
+        x=[date[0] for date in future_dates],
+        y=predictions,
+        name='Prediction Trend',
+        mode='lines',
+        line=dict(dash='dash', color='red')
+    ))
+
+    fig_predict.update_layout(
+        title=f'Mechanical Cancellation Predictions for {calendar.month_name[month]}',
+        xaxis_title='Year',
+        yaxis_title='Cancellation Rate (%)',
+        hovermode='x unified'
+    )
+    return fig_predict
+
+
+def chart_inputs():
+    """Return (data, version, importance_df, month_tables) shared by every session in this process.
+
+    ``month_tables[month - 1]`` is that month's (future_dates, predictions).
+    The serving store's precomputed tables are used when they were built from
+    the current dataset, otherwise the forest is fitted here. Everything is
+    reloaded when the dataset version changes.
+    """
+    global _inputs
+    version = dataset_version()
+    with _inputs_lock:
+        if _inputs is None or _inputs[1] != version:
+            data = load_rail_dataset()
+            shared = open_shared_store()
+            if shared is not None and shared.meta.get('dataset_version') == version:
+                importance_df = shared.feature_importance()
+                month_tables = [shared.month_predictions(month) for month in range(1, 13)]
+            else:
+                forest = fit_cancellation_model(data)
+                importance_df = feature_importance(data, forest)
+                future_dates, predictions = month_prediction_table(data, forest)
+                month_tables = list(zip(future_dates.tolist(), predictions))
+            _inputs = (data, version, importance_df, month_tables)
+        return _inputs
+
+
+def _renderers(data, importance_df, month_tables):
+    return {
+        'heatmap': lambda: create_monthly_heatmap(data),
+        'trend': lambda: create_trend_chart(data),
+        'box': lambda: create_monthly_box_plot(data),
+        'importance': lambda: show_feature_importance(importance_df),
+        'predictions': lambda month: create_prediction_chart(data, month, *month_tables[month - 1]),
+    }
+
+
+def cached_figure(name, **params):
+    """Return a shared, read-only figure for one of the page's charts"""
+    data, version, importance_df, month_tables = chart_inputs()
+    render = _renderers(data, importance_df, month_tables)[name]
+    return _figures.figure(name, version, render, **params)
+
+
+def _warmup_jobs():
+    data, version, importance_df, month_tables = chart_inputs()
+    renderers = _renderers(data, importance_df, month_tables)
+    for name in STATIC_CHARTS:
+        yield name, version, renderers[name], {}
+    for month in range(1, 13):
+        yield 'predictions', version, renderers['predictions'], {'month': month}
+
+
+@lru_cache(maxsize=None)
+def _start_warmup(version):
+    return _figures.warm(_warmup_jobs(), thread_name=f'cancellation-chart-warmup-{version}')
+
+
+def start_chart_warmup():
+    """Render every chart and all 12 month variants in the background, once per process and dataset version"""
+    return _start_warmup(dataset_version())
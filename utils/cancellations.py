@@ -0,0 +1,66 @@
+"""Mechanical cancellation model used by the Mechanical Cancellations page."""
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor
+
+FEATURES = ['YEAR', 'MONTH_NUM', 'MEAN_DISTANCE_BEFORE_FAILURE', 'ON_TIME_PERCENTAGE']
+
+
+def fit_cancellation_model(data):
+    """Fit the random forest that predicts the mechanical cancellation rate"""
+    model = RandomForestRegressor(n_estimators=100, random_state=42)
+    model.fit(data[FEATURES], data['CANCEL_PERCENTAGE'])
+    return model
+
+
+def predict_mechanical_failures(data, target_month=None, model=None):
+    """Return (future_dates, predictions) for one month across years or the next 6 months"""
+    if model is None:
+        model = fit_cancellation_model(data)
+
+    # Use average values for the non-calendar features
+    avg_distance = data['MEAN_DISTANCE_BEFORE_FAILURE'].mean()
+    avg_ontime = data['ON_TIME_PERCENTAGE'].mean()
+
+    if target_month:
+        # Predict for specific month across years
+        years = range(int(data['YEAR'].min()), int(data['YEAR'].max()) + 2)
+        future_dates = [[year, target_month, avg_distance, avg_ontime] for year in years]
+    else:
+        # Predict next 6 months
+        current_year = int(data['YEAR'].max())
+        current_month = int(data['MONTH_NUM'].max())
+
+        future_dates = []
+        for i in range(1, 7):
+            month = (current_month + i) % 12
+            if month == 0:
+                month = 12
+            year = current_year + (current_month + i - 1) // 12
+            future_dates.append([year, month, avg_distance, avg_ontime])
+
+    predictions = model.predict(pd.DataFrame(future_dates, columns=FEATURES))
+    return future_dates, predictions
+
+
+def feature_importance(data, model=None):
+    """Return the model's feature importances sorted from most to least important"""
+    if model is None:
+        model = fit_cancellation_model(data)
+    return pd.DataFrame({
+        'Feature': FEATURES,
+        'Importance': model.feature_importances_
+    }).sort_values('Importance', ascending=False)
+
+
+def month_prediction_table(data, model=None):
+    """Precompute predictions for all 12 months as (future_dates, predictions) arrays.
+
+    ``future_dates`` has shape (12, n_years, 4) and ``predictions`` (12, n_years).
+    """
+    if model is None:
+        model = fit_cancellation_model(data)
+    results = [predict_mechanical_failures(data, month, model) for month in range(1, 13)]
+    future_dates = np.array([dates for dates, _ in results], dtype=np.float64)
+    predictions = np.array([preds for _, preds in results], dtype=np.float64)
+    return future_dates, predictions
@@ -0,0 +1,402 @@
+"""Feature engineering for the train delay model.
+
+``prepare_training_frame`` is the training preprocessing (used by
+``scripts/train_delay.py`` and ``Analyst/better_model.ipynb``) and
+``build_feature_frame`` builds the same columns at inference time, so the
+training script, the notebook and the Train Delay page share one definition
+of every feature.
+
+Features are stored in compact dtypes (``FEATURE_DTYPES``). ``encode_matrix``
+packs any feature list into a single NumPy array of the smallest dtype that
+holds every column. ``prune_features`` drops columns that carry no
+information for the model. ``DelayFeatureEncoder`` produces the same
+encoding as ``encode_matrix(build_feature_frame(...))`` without building a
+DataFrame per request; ``check_encoder_parity`` verifies that.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.live_delays import LIVE_FEATURES, live_features_for_training
+
+RUSH_HOURS = [7, 8, 9, 16, 17, 18, 19]
+BASE_FEATURES = [
+    'hour_of_day', 'day_of_week', 'month',
+    'is_weekend', 'is_rush_hour',
+    'from_id', 'to_id'
+]
+ONE_HOT_COLUMNS = ['line', 'type', 'status']
+TARGET = 'delay_minutes'
+
+LINE_COLUMNS = [
+    'line_Atl. City Line',
+    'line_Bergen Co. Line ',
+    'line_Gladstone Branch',
+    'line_Main Line',
+    'line_Montclair-Boonton',
+    'line_Morristown Line',
+    'line_No Jersey Coast',
+    'line_Northeast Corrdr',
+    'line_Pascack Valley',
+    'line_Princeton Shuttle',
+    'line_Raritan Valley',
+]
+
+# The page only predicts scheduled NJ Transit departures, so these never vary at inference
+INFERENCE_CONSTANTS = {
+    'type_NJ Transit': 1,
+    'status_cancelled': 0,
+    'status_departed': 1,
+    'status_estimated': 0,
+}
+INFERENCE_ROWS = {'type': 'NJ Transit', 'status': 'departed'}
+
+# The 22 columns the original delay_predictor.joblib was trained on
+LEGACY_FEATURES = BASE_FEATURES + LINE_COLUMNS + list(INFERENCE_CONSTANTS)
+
+# Station ids go up to 43599, so they need 16 bits; a missing id (-1) is stored
+# as 0, which sorts below every real id just like -1 did
+FEATURE_DTYPES = dict(
+    {name: np.uint8 for name in LEGACY_FEATURES},
+    from_id=np.uint16,
+    to_id=np.uint16,
+)
+
+# Columns computed from another feature; trees learn them from the source column
+DERIVED_FEATURES = {
+    'is_weekend': 'day_of_week',
+    'is_rush_hour': 'hour_of_day',
+}
+
+# Line lookup used by the page until a station-to-line table is available
+NORTHEAST_CORRIDOR_STATIONS = [107, 105, 38187]
+GLADSTONE_BRANCH_STATIONS = [49, 117, 45]
+
+
+def _station_ids(ids):
+    """Encode station ids as uint16 with missing ids mapped to 0"""
+    ids = pd.Series(ids).fillna(-1).to_numpy()
+    return np.where(ids < 0, 0, ids).astype(np.uint16)
+
+
+def prepare_training_frame(df, compact=False, live_window=None):
+    """Return (X, y, scheduled_time) from raw departures, sorted by scheduled time.
+
+    With ``compact=True`` only the rows the page can ask about (scheduled NJ
+    Transit departures) are kept, every column uses its compact dtype and
+    uninformative columns are pruned. With ``live_window`` the rolling
+    ``live_*`` delay features from ``utils.live_delays`` are added.
+    """
+    df = df.copy()
+
+    # Convert datetime columns and drop rows where conversion failed
+    df['scheduled_time'] = pd.to_datetime(df['scheduled_time'], errors='coerce')
+    df['actual_time'] = pd.to_datetime(df['actual_time'], errors='coerce')
+    df = df.dropna(subset=['scheduled_time', 'actual_time'])
+
+    # Live features replay every observed delay, before any rows are filtered out
+    if live_window:
+        df = df.assign(**live_features_for_training(df, live_window))
+
+    if compact:
+        for column, value in INFERENCE_ROWS.items():
+            if column in df.columns:
+                df = df[df[column] == value]
+
+    # Create basic features
+    df['hour_of_day'] = df['scheduled_time'].dt.hour
+    df['day_of_week'] = df['scheduled_time'].dt.dayofweek
+    df['month'] = df['scheduled_time'].dt.month
+    df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
+    df['is_rush_hour'] = df['hour_of_day'].isin(RUSH_HOURS).astype(int)
+
+    # Handle missing values
+    df[TARGET] = df[TARGET].fillna(0)
+    df['from_id'] = df['from_id'].fillna(-1)
+    df['to_id'] = df['to_id'].fillna(-1)
+
+    # Remove outliers
+    q1 = df[TARGET].quantile(0.25)
+    q3 = df[TARGET].quantile(0.75)
+    iqr = q3 - q1
+    df = df[df[TARGET].between(q1 - 1.5 * iqr, q3 + 1.5 * iqr)]
+
+    # One-hot encode categorical variables
+    present = [col for col in ONE_HOT_COLUMNS if col in df.columns]
+    df = pd.get_dummies(df, columns=present, prefix=present)
+
+    features = BASE_FEATURES + [col for col in df.columns if col.startswith(tuple(f'{c}_' for c in present))]
+    if live_window:
+        features += LIVE_FEATURES
+    features = [f for f in features if f in df.columns]
+
+    df = df.sort_values('scheduled_time', kind='stable')
+    y = df[TARGET].to_numpy(dtype=np.float64)
+    scheduled_time = df['scheduled_time'].to_numpy()
+    if not compact:
+        return df[features].astype(np.float32), y, scheduled_time
+
+    X = pd.DataFrame({
+        name: _station_ids(df[name]) if name in ('from_id', 'to_id') else df[name].to_numpy(dtype=feature_dtype(name))
+        for name in features
+    })
+    kept, _ = prune_features(X)
+    return X[kept], y, scheduled_time
+
+
+def feature_dtype(name):
+    """Return the compact dtype for a feature column"""
+    if name in FEATURE_DTYPES:
+        return FEATURE_DTYPES[name]
+    if name.startswith(tuple(f'{c}_' for c in ONE_HOT_COLUMNS)):
+        return np.uint8
+    return np.float32
+
+
+def prune_features(X):
+    """Return (kept_columns, dropped) where dropped maps column -> reason.
+
+    A column is dropped when it is constant, an exact duplicate of an earlier
+    column, or one of ``DERIVED_FEATURES`` while its source column is kept (a
+    tree can split on the source directly).
+    """
+    kept = []
+    dropped = {}
+    for column in X.columns:
+        values = X[column]
+        if values.nunique(dropna=False) <= 1:
+            dropped[column] = 'constant'
+            continue
+        source = next((other for other in kept if X[other].equals(values)), None)
+        if source is not None:
+            dropped[column] = f'duplicate of {source}'
+            continue
+        kept.append(column)
+
+    for column, source in DERIVED_FEATURES.items():
+        if column in kept and source in kept:
+            kept.remove(column)
+            dropped[column] = f'derived from {source}'
+    return kept, dropped
+
+
+def line_for_station(from_id):
+    """Return the line_* column the page assumes for a departure station"""
+    if from_id in NORTHEAST_CORRIDOR_STATIONS:
+        return 'line_Northeast Corrdr'
+    if from_id in GLADSTONE_BRANCH_STATIONS:
+        return 'line_Gladstone Branch'
+    return 'line_Main Line'
+
+
+def build_feature_frame(hour, day, from_id, to_id, month=None):
+    """Build every known feature column for one or many inference requests.
+
+    Arguments may be scalars or equal-length arrays. Columns use their compact
+    dtypes.
+    """
+    if month is None:
+        month = pd.Timestamp.now().month
+    hour, day, from_id, to_id, month = np.broadcast_arrays(
+        np.asarray(hour), np.asarray(day), np.asarray(from_id), np.asarray(to_id), np.asarray(month)
+    )
+    hour, day, from_id, to_id, month = (np.atleast_1d(a) for a in (hour, day, from_id, to_id, month))
+    n = hour.shape[0]
+
+    frame = {
+        'hour_of_day': hour.astype(np.uint8),
+        'day_of_week': day.astype(np.uint8),
+        'month': month.astype(np.uint8),
+        'is_weekend': np.isin(day, [5, 6]).astype(np.uint8),
+        'is_rush_hour': np.isin(hour, RUSH_HOURS).astype(np.uint8),
+        'from_id': _station_ids(from_id),
+        'to_id': _station_ids(to_id),
+    }
+
+    # Exactly one line flag per row, following the page's station heuristic
+    for column in LINE_COLUMNS:
+        frame[column] = np.zeros(n, dtype=np.uint8)
+    frame['line_Northeast Corrdr'][np.isin(from_id, NORTHEAST_CORRIDOR_STATIONS)] = 1
+    gladstone = np.isin(from_id, GLADSTONE_BRANCH_STATIONS)
+    frame['line_Gladstone Branch'][gladstone] = 1
+    frame['line_Main Line'][~gladstone & ~np.isin(from_id, NORTHEAST_CORRIDOR_STATIONS)] = 1
+
+    for column, value in INFERENCE_CONSTANTS.items():
+        frame[column] = np.full(n, value, dtype=np.uint8)
+    return pd.DataFrame(frame)
+
+
+def line_names(frame):
+    """Return the line name set in each row's line_* flags"""
+    positions = frame[LINE_COLUMNS].to_numpy().argmax(axis=1)
+    return [LINE_COLUMNS[i][len('line_'):] for i in positions]
+
+
+def encode_matrix(frame, features):
+    """Pack ``features`` from ``frame`` into one array of the smallest shared dtype.
+
+    Columns the frame does not have (e.g. a line the model never saw) are zero.
+    """
+    dtype = np.result_type(*(feature_dtype(name) for name in features))
+    out = np.zeros((len(frame), len(features)), dtype=dtype)
+    for i, name in enumerate(features):
+        if name in frame:
+            out[:, i] = frame[name].to_numpy()
+    return out
+
+
+class DelayFeatureEncoder:
+    """Encode inference requests straight into a model's feature order.
+
+    Column positions are resolved against ``features`` once. Single requests
+    are written into a reusable per-thread row buffer, and encoded rows are
+    memoized per (hour, day, from_id, to_id, month) in a bounded LRU. Batches
+    are written into a reusable per-thread buffer that grows as needed.
+    Returned buffers are overwritten by the next call from the same thread.
+    """
+
+    def __init__(self, features, cache_size=4096):
+        self.features = list(features)
+        self.dtype = np.result_type(*(feature_dtype(name) for name in self.features))
+        index = {name: i for i, name in enumerate(self.features)}
+        self._slot = {name: index.get(name) for name in BASE_FEATURES}
+        self._lines = {name: index[name] for name in LINE_COLUMNS if name in index}
+        self._constants = [(index[name], value) for name, value in INFERENCE_CONSTANTS.items() if name in index]
+        self._live = [(name, index[name]) for name in LIVE_FEATURES if name in index]
+
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _row_buffer(self):
+        buffer = getattr(self._local, 'row', None)
+        if buffer is None:
+            buffer = self._local.row = np.zeros((1, len(self.features)), dtype=self.dtype)
+        return buffer
+
+    def _batch_buffer(self, n):
+        buffer = getattr(self._local, 'batch', None)
+        if buffer is None or buffer.shape[0] < n:
+            buffer = self._local.batch = np.empty((n, len(self.features)), dtype=self.dtype)
+        return buffer[:n]
+
+    def _encode_row(self, hour, day, from_id, to_id, month):
+        """Encode one request into a new row, mirroring build_feature_frame"""
+        values = {
+            'hour_of_day': hour,
+            'day_of_week': day,
+            'month': month,
+            'is_weekend': 1 if day in [5, 6] else 0,
+            'is_rush_hour': 1 if hour in RUSH_HOURS else 0,
+            'from_id': from_id if from_id == from_id and from_id >= 0 else 0,
+            'to_id': to_id if to_id == to_id and to_id >= 0 else 0,
+        }
+        row = np.zeros(len(self.features), dtype=self.dtype)
+        for name, slot in self._slot.items():
+            if slot is not None:
+                row[slot] = values[name]
+        line_slot = self._lines.get(line_for_station(from_id))
+        if line_slot is not None:
+            row[line_slot] = 1
+        for slot, value in self._constants:
+            row[slot] = value
+        return row
+
+    def encode(self, hour, day, from_id, to_id, month=None, live=None):
+        """Return a (1, n_features) array for one request.
+
+        ``live`` is the dict returned by ``LiveDelayTracker.features``.
+        """
+        if month is None:
+            month = pd.Timestamp.now().month
+        key = (hour, day, from_id, to_id, month)
+        with self._lock:
+            row = self._cache.get(key)
+            if row is not None:
+                self._cache.move_to_end(key)
+        if row is None:
+            row = self._encode_row(*key)
+            with self._lock:
+                self._cache[key] = row
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        buffer = self._row_buffer()
+        buffer[0] = row
+        if live is not None:
+            for name, slot in self._live:
+                buffer[0, slot] = live[name][0]
+        return buffer
+
+    def encode_batch(self, hour, day, from_id, to_id, month=None, live=None):
+        """Return an (n, n_features) array for equal-length request arrays"""
+        if month is None:
+            month = pd.Timestamp.now().month
+        hour, day, from_id, to_id, month = np.broadcast_arrays(
+            np.atleast_1d(hour), np.atleast_1d(day), np.atleast_1d(from_id), np.atleast_1d(to_id),
+            np.atleast_1d(month)
+        )
+        out = self._batch_buffer(hour.shape[0])
+        out[:] = 0
+
+        columns = {
+            'hour_of_day': lambda: hour,
+            'day_of_week': lambda: day,
+            'month': lambda: month,
+            'is_weekend': lambda: np.isin(day, [5, 6]),
+            'is_rush_hour': lambda: np.isin(hour, RUSH_HOURS),
+            'from_id': lambda: _station_ids(from_id),
+            'to_id': lambda: _station_ids(to_id),
+        }
+        for name, slot in self._slot.items():
+            if slot is not None:
+                out[:, slot] = columns[name]()
+
+        northeast = np.isin(from_id, NORTHEAST_CORRIDOR_STATIONS)
+        gladstone = np.isin(from_id, GLADSTONE_BRANCH_STATIONS)
+        line_masks = {
+            'line_Northeast Corrdr': northeast,
+            'line_Gladstone Branch': gladstone,
+            'line_Main Line': ~northeast & ~gladstone,
+        }
+        for name, mask in line_masks.items():
+            if name in self._lines:
+                out[:, self._lines[name]] = mask
+        for slot, value in self._constants:
+            out[:, slot] = value
+        if live is not None:
+            for name, slot in self._live:
+                out[:, slot] = live[name]
+        return out
+
+
+def check_encoder_parity(features, n_stations):
+    """Check ``DelayFeatureEncoder`` against ``encode_matrix(build_feature_frame(...))``.
+
+    Every request in a grid is encoded as one batch and then one at a time,
+    twice, through a 64-entry cache so rows are evicted and re-encoded. Live
+    delays are compared when ``features`` includes them. Raises AssertionError
+    on the first mismatch and returns the number of rows checked.
+    """
+    stations = list(range(1, n_stations + 1)) + NORTHEAST_CORRIDOR_STATIONS + GLADSTONE_BRANCH_STATIONS + [-1]
+    hour, day, from_id, to_id = (a.ravel() for a in np.meshgrid(np.arange(24), np.arange(7), stations, [105, -1],
+                                                                 indexing='ij'))
+    rng = np.random.default_rng(0)
+    live = {name: rng.gamma(2.0, 2.0, size=len(hour)).astype(np.float32) for name in LIVE_FEATURES}
+    expected = encode_matrix(build_feature_frame(hour, day, from_id, to_id, 6).assign(**live), features)
+
+    # Small cache so the LRU evicts and re-encodes during the check
+    encoder = DelayFeatureEncoder(features, cache_size=64)
+    batch = encoder.encode_batch(hour, day, from_id, to_id, 6, live=live)
+    if batch.dtype != expected.dtype or not np.array_equal(batch, expected):
+        raise AssertionError(f"encode_batch differs from encode_matrix for {len(features)} features")
+    for _ in range(2):
+        for i in range(len(hour)):
+            row = encoder.encode(hour[i], day[i], from_id[i], to_id[i], 6,
+                                 live={name: values[i:i + 1] for name, values in live.items()})
+            if row.dtype != expected.dtype or not np.array_equal(row[0], expected[i]):
+                raise AssertionError(f"encode differs from encode_matrix at row {i} for {len(features)} features")
+    return len(hour)
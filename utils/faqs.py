@@ -0,0 +1,33 @@
+"""FAQ loading and prompt context for the Train Support page."""
+import json
+import os
+
+FAQ_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'FAQs_-_01042022.json')
+
+
+def read_faqs(file_path=FAQ_PATH):
+    """Return the FAQs as a flat list of section/question/answer dicts"""
+    with open(file_path, 'r') as file:
+        data = json.load(file)
+
+    faqs = []
+    for section in data['iOSfaqs']['sections']:
+        section_name = section['sec_name']
+        for qa in section['sec_data']:
+            faqs.append({
+                'section': section_name,
+                'question': qa['q'],
+                'answer': qa['a']
+            })
+    return faqs
+
+
+def create_context_from_faqs(faqs):
+    """Build the system prompt that grounds the assistant in the official FAQs"""
+    context = "You are an NJ Transit support assistant. Here are the official FAQs you should base your answers on:\n\n"
+    for faq in faqs:
+        context += f"Section: {faq['section']}\n"
+        context += f"Q: {faq['question']}\n"
+        context += f"A: {faq['answer']}\n\n"
+    context += "\nPlease use this information to answer questions. If a question isn't covered in the FAQs, you can provide general help but mention that the information is not from the official FAQs."
+    return context
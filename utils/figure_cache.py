@@ -0,0 +1,71 @@
+"""Cache of Plotly figures keyed on a data version and parameters.
+
+Building a figure (and for some charts, fitting a trend line) is repeated on
+every Streamlit rerun although most charts only change when the data does.
+``FigureCache`` builds each figure once per (name, data version, parameters)
+and keeps it in a bounded LRU. It can render a list of figures in a background
+thread so the first visitor doesn't pay for them. ``st.plotly_chart`` still
+serializes the figure on every rerun; it has no public way to accept
+pre-serialized JSON.
+"""
+import threading
+from collections import OrderedDict
+
+
+class FigureCache:
+    """Thread-safe LRU of rendered figures"""
+
+    def __init__(self, maxsize=64):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(name, version, params):
+        return (name, version, tuple(sorted(params.items())))
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def _lookup(self, key):
+        with self._lock:
+            figure = self._entries.get(key)
+            if figure is not None:
+                self._entries.move_to_end(key)
+            return figure
+
+    def figure(self, name, version, render, **params):
+        """Return the cached figure, calling ``render(**params)`` on a miss.
+
+        Treat the figure as read-only since it is shared.
+        """
+        key = self.key(name, version, params)
+        figure = self._lookup(key)
+        if figure is None:
+            # Render outside the lock; if two callers race, the first stored figure wins
+            figure = render(**params)
+            with self._lock:
+                figure = self._entries.setdefault(key, figure)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return figure
+
+    def warm(self, jobs, thread_name='figure-cache-warm'):
+        """Render ``(name, version, render, params)`` jobs in a daemon thread and return the thread.
+
+        ``jobs`` may be a generator; it is consumed in the thread, so any data
+        loading it does happens in the background too.
+        """
+        def run():
+            for name, version, render, params in jobs:
+                self.figure(name, version, render, **params)
+
+        thread = threading.Thread(target=run, name=thread_name, daemon=True)
+        thread.start()
+        return thread
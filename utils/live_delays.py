@@ -0,0 +1,179 @@
+"""Rolling per-line and per-station delay aggregates from a live departure feed.
+
+Events use the ``data.csv`` schema from ``Analyst/better_model.ipynb`` (one
+row per stop with ``line``, ``to_id``, ``actual_time`` and ``delay_minutes``).
+``LiveDelayTracker`` keeps the last ``window`` delays per line and per station
+in fixed-size ring buffers with running sums, so each update and each lookup
+is O(1). Its means are exposed as the ``live_line_delay`` and
+``live_station_delay`` features. A model trained with
+``prepare_training_frame(..., live_window=...)`` can use them.
+"""
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+LIVE_FEATURES = ['live_line_delay', 'live_station_delay']
+
+# Replay file the Train Delay page feeds its tracker from, and its speed-up over real time
+LIVE_REPLAY_ENV = 'NJT_LIVE_REPLAY'
+LIVE_SPEEDUP_ENV = 'NJT_LIVE_SPEEDUP'
+
+
+class RingBuffer:
+    """Fixed-capacity buffer of the most recent values with an O(1) running mean"""
+
+    __slots__ = ('values', 'index', 'count', 'total')
+
+    def __init__(self, capacity):
+        self.values = np.zeros(capacity, dtype=np.float64)
+        self.index = 0
+        self.count = 0
+        self.total = 0.0
+
+    def push(self, value):
+        capacity = self.values.shape[0]
+        if self.count == capacity:
+            self.total -= self.values[self.index]
+        else:
+            self.count += 1
+        self.values[self.index] = value
+        self.total += value
+        self.index = (self.index + 1) % capacity
+
+    def mean(self, default=0.0):
+        return self.total / self.count if self.count else default
+
+
+class LiveDelayTracker:
+    """Thread-safe rolling delay means keyed by line name and station id.
+
+    Stations are keyed by the stop where the delay was observed (``to_id``) and
+    looked up by the rider's departure station. With no recent events a key
+    falls back to the network-wide rolling mean.
+    """
+
+    def __init__(self, window=20):
+        self.window = window
+        self.lines = {}
+        self.stations = {}
+        self.network = RingBuffer(window * 10)
+        self.events = 0
+        self.last_event_time = None
+        self._lock = threading.Lock()
+
+    def update(self, line, station_id, delay, event_time=None):
+        """Record one observed delay"""
+        with self._lock:
+            buffer = self.lines.get(line)
+            if buffer is None:
+                buffer = self.lines[line] = RingBuffer(self.window)
+            buffer.push(delay)
+            buffer = self.stations.get(station_id)
+            if buffer is None:
+                buffer = self.stations[station_id] = RingBuffer(self.window)
+            buffer.push(delay)
+            self.network.push(delay)
+            self.events += 1
+            if event_time is not None:
+                self.last_event_time = event_time
+
+    def features(self, lines, station_ids):
+        """Return the live feature columns for equal-length sequences of lines and stations"""
+        with self._lock:
+            default = self.network.mean()
+            line_delay = [self.lines[line].mean() if line in self.lines else default for line in lines]
+            station_delay = [
+                self.stations[station].mean() if station in self.stations else default for station in station_ids
+            ]
+        return {
+            'live_line_delay': np.asarray(line_delay, dtype=np.float32),
+            'live_station_delay': np.asarray(station_delay, dtype=np.float32),
+        }
+
+
+def replay_events(path, chunk_size=50_000):
+    """Yield (line, station_id, delay, actual_time) events in the order they happened"""
+    df = pd.read_csv(path, usecols=['line', 'to_id', 'actual_time', 'delay_minutes'])
+    df['actual_time'] = pd.to_datetime(df['actual_time'], errors='coerce')
+    df = df.dropna(subset=['actual_time', 'to_id']).sort_values('actual_time', kind='stable')
+    df['delay_minutes'] = df['delay_minutes'].fillna(0)
+    df['line'] = df['line'].fillna('')
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size]
+        yield from zip(chunk['line'].to_numpy(), chunk['to_id'].astype(np.int64).to_numpy(),
+                       chunk['delay_minutes'].to_numpy(), chunk['actual_time'])
+
+
+def paced(events, speedup):
+    """Yield (emitted_at, event) with events released at ``speedup`` x their real spacing.
+
+    ``emitted_at`` is the wall-clock time the event is due; a speed-up of 0
+    releases events as fast as they can be read.
+    """
+    wall_start = first_time = None
+    for event in events:
+        if not speedup:
+            yield time.perf_counter(), event
+            continue
+        if first_time is None:
+            wall_start, first_time = time.perf_counter(), event[3]
+        due = wall_start + (event[3] - first_time).total_seconds() / speedup
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        yield due, event
+
+
+def start_replay(tracker, path, speedup=60.0):
+    """Feed ``tracker`` from a replay file in a daemon thread and return the thread"""
+    def run():
+        for _, (line, station_id, delay, event_time) in paced(replay_events(path), speedup):
+            tracker.update(line, station_id, delay, event_time)
+
+    thread = threading.Thread(target=run, name='live-delay-replay', daemon=True)
+    thread.start()
+    return thread
+
+
+def tracker_from_env():
+    """Start a tracker fed by ``NJT_LIVE_REPLAY`` if it is set, otherwise return None"""
+    path = os.environ.get(LIVE_REPLAY_ENV)
+    if not path:
+        return None
+    tracker = LiveDelayTracker()
+    start_replay(tracker, path, float(os.environ.get(LIVE_SPEEDUP_ENV, 60)))
+    return tracker
+
+
+def live_features_for_training(df, window=20):
+    """Compute the live features each row would have seen at its scheduled time.
+
+    Events are applied in ``actual_time`` order, and a row only sees events that
+    happened at or before its ``scheduled_time``, so nothing leaks from the future.
+    """
+    df = df.assign(line=df['line'].fillna(''))
+    events = df[['line', 'to_id', 'actual_time', 'delay_minutes']].dropna(subset=['actual_time', 'to_id'])
+    events = events.sort_values('actual_time', kind='stable')
+    order = np.argsort(df['scheduled_time'].to_numpy(), kind='stable')
+
+    tracker = LiveDelayTracker(window)
+    event_times = events['actual_time'].to_numpy()
+    event_rows = list(zip(events['line'].to_numpy(), events['to_id'].astype(np.int64).to_numpy(),
+                          events['delay_minutes'].fillna(0).to_numpy()))
+    scheduled = df['scheduled_time'].to_numpy()
+    lines = df['line'].to_numpy()
+    stations = df['from_id'].to_numpy()
+
+    out = {name: np.zeros(len(df), dtype=np.float32) for name in LIVE_FEATURES}
+    applied = 0
+    for i in order:
+        while applied < len(event_rows) and event_times[applied] <= scheduled[i]:
+            tracker.update(*event_rows[applied])
+            applied += 1
+        row = tracker.features([lines[i]], [stations[i]])
+        for name in LIVE_FEATURES:
+            out[name][i] = row[name][0]
+    return out
@@ -0,0 +1,48 @@
+"""Local stand-in for the Gemini chat model, used when load testing the support chat.
+
+When ``NJT_STUB_LLM`` is set to a latency in milliseconds, the Train Support
+page uses ``StubChatModel`` instead of calling the Gemini API. Each
+``send_message`` sleeps for that latency and returns a canned reply, so a load
+test exercises the page without network calls or API quota.
+"""
+import os
+import time
+
+STUB_LLM_ENV = 'NJT_STUB_LLM'
+
+
+class StubResponse:
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+
+class StubChat:
+    """Mirrors the ``start_chat`` session API the page uses"""
+
+    def __init__(self, latency, history=None):
+        self.latency = latency
+        self.history = list(history or [])
+
+    def send_message(self, content):
+        self.history.append(content)
+        if self.latency:
+            time.sleep(self.latency)
+        return StubResponse(f"Stub answer to a {len(str(content).split())}-word message.")
+
+
+class StubChatModel:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def start_chat(self, history=None):
+        return StubChat(self.latency, history)
+
+
+def stub_model_from_env():
+    """Return a ``StubChatModel`` if ``NJT_STUB_LLM`` is set, otherwise None"""
+    latency_ms = os.environ.get(STUB_LLM_ENV)
+    if not latency_ms:
+        return None
+    return StubChatModel(float(latency_ms) / 1000)
@@ -0,0 +1,337 @@
+"""Versioned model bundles that load without unpickling the estimator.
+
+A bundle is a directory holding two files:
+
+* ``manifest.json`` - format version, model version, feature schema, training
+  data hash, metrics and the dtype/shape/offset of every stored array.
+* ``payload.bin`` - the arrays, uncompressed and 64-byte aligned, so they can
+  be mapped read-only with ``np.memmap``. Every process that maps the same
+  bundle shares the pages through the OS page cache.
+
+Tree ensembles (random forests and gradient boosting) are flattened into
+node arrays and evaluated by ``TreeEnsembleModel``; any other estimator is
+stored as an uncompressed joblib pickle and loaded with ``mmap_mode='r'``.
+
+Convert the legacy joblib files with::
+
+    python -m utils.model_bundle models/delay_predictor.joblib \\
+        --features models/features_list.joblib --metrics models/metrics.joblib
+"""
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+BUNDLE_FORMAT = 'njt-model-bundle'
+BUNDLE_FORMAT_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+PAYLOAD_NAME = 'payload.bin'
+PICKLE_NAME = 'model.joblib'
+BUNDLE_KINDS = ('tree_ensemble', 'pickle')
+ALIGNMENT = 64
+
+LFS_POINTER_PREFIX = b'version https://git-lfs.github.com/spec/'
+
+
+class ModelBundleError(ValueError):
+    """Raised when a model artifact is missing, corrupted or incompatible"""
+
+
+def is_lfs_pointer(path):
+    """Return True if the file is a Git LFS pointer instead of real content"""
+    with open(path, 'rb') as file:
+        return file.read(len(LFS_POINTER_PREFIX)) == LFS_POINTER_PREFIX
+
+
+def file_sha256(path):
+    """Return the sha256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class TreeEnsembleModel:
+    """Numpy evaluator for a flattened regression tree ensemble.
+
+    All trees share one set of node arrays. Leaf nodes point to themselves, so
+    walking every tree ``max_depth`` steps always ends on a leaf.
+    """
+
+    def __init__(self, arrays, base, scale, max_depth, feature_names):
+        self.roots = arrays['roots']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.value = arrays['value']
+        self.base = base
+        self.scale = scale
+        self.max_depth = max_depth
+        self.feature_names_in_ = np.asarray(feature_names, dtype=object)
+        self.n_features_in_ = len(feature_names)
+
+    def predict(self, X, block_size=4096):
+        """Predict targets for a 2D array-like of shape (n_samples, n_features)"""
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected input with {self.n_features_in_} features, got shape {X.shape}")
+
+        out = np.empty(X.shape[0], dtype=np.float64)
+        for start in range(0, X.shape[0], block_size):
+            # Trees are trained on float32 inputs, compare the same way sklearn does.
+            # Converting per block keeps compact uint8/uint16 inputs compact.
+            block = X[start:start + block_size].astype(np.float32, copy=False)
+            rows = np.arange(block.shape[0])
+            node = np.repeat(self.roots[:, None], block.shape[0], axis=1)
+            for _ in range(self.max_depth):
+                go_left = block[rows, self.feature[node]] <= self.threshold[node]
+                node = np.where(go_left, self.left[node], self.right[node])
+            out[start:start + block.shape[0]] = self.base + self.scale * self.value[node].sum(axis=0)
+        return out
+
+
+def _flatten_trees(model):
+    """Return (arrays, base, scale, max_depth) for a supported sklearn ensemble"""
+    from sklearn.ensemble import (ExtraTreesRegressor, GradientBoostingRegressor,
+                                  RandomForestRegressor)
+
+    if isinstance(model, GradientBoostingRegressor):
+        trees = [est.tree_ for est in model.estimators_[:, 0]]
+        base = float(model._raw_predict_init(np.zeros((1, model.n_features_in_), dtype=np.float32))[0, 0])
+        scale = float(model.learning_rate)
+    elif isinstance(model, (RandomForestRegressor, ExtraTreesRegressor)):
+        if model.n_outputs_ != 1:
+            return None
+        trees = [est.tree_ for est in model.estimators_]
+        base = 0.0
+        scale = 1.0 / len(trees)
+    else:
+        return None
+
+    roots, left, right, feature, threshold, value = [], [], [], [], [], []
+    offset = 0
+    for tree in trees:
+        node_ids = np.arange(tree.node_count, dtype=np.int32)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        left.append(np.where(is_leaf, node_ids, tree.children_left).astype(np.int32) + offset)
+        right.append(np.where(is_leaf, node_ids, tree.children_right).astype(np.int32) + offset)
+        feature.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+        threshold.append(tree.threshold.astype(np.float64))
+        value.append(tree.value[:, 0, 0].astype(np.float64))
+        offset += tree.node_count
+
+    arrays = {
+        'roots': np.asarray(roots, dtype=np.int32),
+        'left': np.concatenate(left),
+        'right': np.concatenate(right),
+        'feature': np.concatenate(feature),
+        'threshold': np.concatenate(threshold),
+        'value': np.concatenate(value),
+    }
+    max_depth = max(tree.max_depth for tree in trees)
+    return arrays, base, scale, max_depth
+
+
+def write_arrays(path, arrays):
+    """Write arrays back to back with alignment padding and return their layout"""
+    layout = {}
+    offset = 0
+    with open(path, 'wb') as file:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            padding = -offset % ALIGNMENT
+            file.write(b'\0' * padding)
+            offset += padding
+            file.write(array.tobytes())
+            layout[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+            offset += array.nbytes
+    return layout
+
+
+def save_bundle(bundle_dir, model, features_list, metrics=None, training_data=None, model_version=None):
+    """Write a model bundle and return its manifest"""
+    import joblib
+
+    os.makedirs(bundle_dir, exist_ok=True)
+    features_list = [str(name) for name in features_list]
+    manifest = {
+        'format': BUNDLE_FORMAT,
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'model_version': model_version or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ'),
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'estimator': type(model).__name__,
+        'feature_schema': features_list,
+        'training_data_sha256': file_sha256(training_data) if training_data else None,
+        'metrics': {name: float(value) for name, value in (metrics or {}).items()},
+    }
+
+    flattened = _flatten_trees(model)
+    if flattened is not None:
+        arrays, base, scale, max_depth = flattened
+        payload_path = os.path.join(bundle_dir, PAYLOAD_NAME)
+        manifest['kind'] = 'tree_ensemble'
+        manifest['params'] = {'base': base, 'scale': scale, 'max_depth': int(max_depth)}
+        manifest['arrays'] = write_arrays(payload_path, arrays)
+    else:
+        payload_path = os.path.join(bundle_dir, PICKLE_NAME)
+        manifest['kind'] = 'pickle'
+        joblib.dump(model, payload_path, compress=0)
+
+    manifest['payload'] = {
+        'file': os.path.basename(payload_path),
+        'size': os.path.getsize(payload_path),
+        'sha256': file_sha256(payload_path),
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_NAME), 'w') as file:
+        json.dump(manifest, file, indent=2)
+    return manifest
+
+
+def read_manifest(bundle_dir, expected_features=None, deep=False):
+    """Validate a bundle and return its manifest without loading the model.
+
+    The default check only reads the manifest and stats the payload, so it is
+    cheap enough to run on every start-up. ``deep=True`` also hashes the payload.
+    """
+    manifest_path = os.path.join(bundle_dir, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        raise ModelBundleError(f"No model bundle manifest at {manifest_path}")
+    if is_lfs_pointer(manifest_path):
+        raise ModelBundleError(f"{manifest_path} is a Git LFS pointer, run `git lfs pull`")
+    try:
+        with open(manifest_path, 'rb') as file:
+            manifest = json.loads(file.read().decode('utf-8'))
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ModelBundleError(f"Corrupted manifest {manifest_path}: {e}") from e
+
+    if not isinstance(manifest, dict) or manifest.get('format') != BUNDLE_FORMAT:
+        raise ModelBundleError(f"{bundle_dir} is not a model bundle")
+    try:
+        if manifest.get('format_version', 0) > BUNDLE_FORMAT_VERSION:
+            raise ModelBundleError(
+                f"Bundle format version {manifest['format_version']} is newer than supported "
+                f"version {BUNDLE_FORMAT_VERSION}"
+            )
+        if manifest.get('kind') not in BUNDLE_KINDS:
+            raise ModelBundleError(f"Unknown model bundle kind {manifest.get('kind')!r} in {manifest_path}")
+        if expected_features is not None and list(expected_features) != manifest['feature_schema']:
+            raise ModelBundleError("Model feature schema does not match the expected features")
+
+        payload_path = os.path.join(bundle_dir, manifest['payload']['file'])
+        if not os.path.exists(payload_path):
+            raise ModelBundleError(f"Missing model payload {payload_path}")
+        if os.path.getsize(payload_path) != manifest['payload']['size']:
+            if is_lfs_pointer(payload_path):
+                raise ModelBundleError(f"{payload_path} is a Git LFS pointer, run `git lfs pull`")
+            raise ModelBundleError(f"Model payload {payload_path} has the wrong size")
+        if deep and file_sha256(payload_path) != manifest['payload']['sha256']:
+            raise ModelBundleError(f"Model payload {payload_path} failed checksum validation")
+    except (KeyError, TypeError) as e:
+        raise ModelBundleError(f"Malformed manifest {manifest_path}: {e!r}") from e
+    return manifest
+
+
+def map_arrays(payload_path, layout):
+    """Map every array in a payload file as a read-only view"""
+    buffer = np.memmap(payload_path, dtype=np.uint8, mode='r')
+    return {
+        name: np.ndarray(tuple(spec['shape']), dtype=np.dtype(spec['dtype']), buffer=buffer, offset=spec['offset'])
+        for name, spec in layout.items()
+    }
+
+
+def load_bundle(bundle_dir, expected_features=None, deep=True):
+    """Load a bundle and return (model, manifest).
+
+    The payload checksum is verified by default; loading happens once per
+    process, and hashing a model of this size takes a few milliseconds.
+    """
+    manifest = read_manifest(bundle_dir, expected_features=expected_features, deep=deep)
+    payload_path = os.path.join(bundle_dir, manifest['payload']['file'])
+
+    if manifest['kind'] == 'tree_ensemble':
+        try:
+            params = manifest['params']
+            model = TreeEnsembleModel(
+                map_arrays(payload_path, manifest['arrays']),
+                base=params['base'],
+                scale=params['scale'],
+                max_depth=params['max_depth'],
+                feature_names=manifest['feature_schema'],
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise ModelBundleError(f"Malformed array layout in {bundle_dir}: {e!r}") from e
+    else:
+        import joblib
+        model = joblib.load(payload_path, mmap_mode='r')
+    return model, manifest
+
+
+def load_legacy_joblib(model_path, features_path, metrics_path=None):
+    """Load the original joblib artifacts, rejecting Git LFS pointer files up front.
+
+    Metrics are optional and default to an empty dict.
+    """
+    import joblib
+
+    for path in (model_path, features_path, metrics_path):
+        if path is None:
+            continue
+        if not os.path.exists(path):
+            raise ModelBundleError(f"Missing model artifact {path}")
+        if is_lfs_pointer(path):
+            raise ModelBundleError(f"{path} is a Git LFS pointer, run `git lfs pull`")
+    metrics = joblib.load(metrics_path) if metrics_path else {}
+    return joblib.load(model_path), list(joblib.load(features_path)), metrics
+
+
+def load_delay_model(model_dir, bundle_dir=None):
+    """Return (model, features_list, metrics) for the delay predictor.
+
+    Loads ``bundle_dir`` if given, otherwise prefers ``delay_predictor.bundle``
+    in ``model_dir`` and falls back to the legacy joblib files. Legacy tree
+    ensembles are converted to a ``TreeEnsembleModel``.
+    """
+    if bundle_dir is None:
+        bundle_dir = os.path.join(model_dir, 'delay_predictor.bundle')
+        if not os.path.exists(os.path.join(bundle_dir, MANIFEST_NAME)):
+            bundle_dir = None
+    if bundle_dir is not None:
+        model, manifest = load_bundle(bundle_dir)
+        return model, manifest['feature_schema'], manifest['metrics']
+    model, features_list, metrics = load_legacy_joblib(
+        os.path.join(model_dir, 'delay_predictor.joblib'),
+        os.path.join(model_dir, 'features_list.joblib'),
+        os.path.join(model_dir, 'metrics.joblib'),
+    )
+    # The legacy forest was fitted on a DataFrame, so sklearn warns on every encoded-array predict;
+    # serve it from the numpy evaluator like a bundle instead
+    flattened = _flatten_trees(model)
+    if flattened is not None:
+        arrays, base, scale, max_depth = flattened
+        model = TreeEnsembleModel(arrays, base, scale, max_depth, features_list)
+    return model, features_list, metrics
+
+
+if __name__ == "__main__":
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Convert a joblib model into a model bundle")
+    parser.add_argument('model', help="Path to the joblib model")
+    parser.add_argument('--features', required=True, help="Path to the joblib features list")
+    parser.add_argument('--metrics', help="Path to the joblib metrics dict")
+    parser.add_argument('--training-data', help="Training data file to fingerprint")
+    parser.add_argument('--version', help="Model version label")
+    parser.add_argument('--out', help="Bundle directory (defaults to <model>.bundle)")
+    args = parser.parse_args()
+
+    model, features_list, metrics = load_legacy_joblib(args.model, args.features, args.metrics)
+    out = args.out or os.path.splitext(args.model)[0] + '.bundle'
+    manifest = save_bundle(out, model, features_list, metrics, args.training_data, args.version)
+    print(f"Wrote {manifest['kind']} bundle {out} ({manifest['payload']['size']} bytes)")
@@ -0,0 +1,255 @@
+"""Build the monthly rail dataset used by the Mechanical Cancellations page.
+
+The raw sources are stored in long form (one row per YEAR, MONTH and STATUS or
+CATEGORY). This module parses each source once, pivots it into wide integer
+columns keyed on an integer ``YM`` (``YEAR * 100 + MONTH_NUM``) and joins
+everything into a single Parquet artifact. A source is only reparsed when its
+content hash changes; files are only rehashed when their mtime/size change.
+
+Run ``python -m utils.rail_data`` from the repo root to rebuild the artifact.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from utils.model_bundle import file_sha256
+
+try:
+    import fcntl
+except ImportError:  # Windows: rebuilds are only serialized within a process
+    fcntl = None
+
+# Define paths relative to the repo root
+ROOT_DIR = os.path.join(os.path.dirname(__file__), '..')
+DATA_DIR = os.path.join(ROOT_DIR, 'data')
+ARTIFACT_PATH = os.path.join(DATA_DIR, 'Combined', 'rail_monthly.parquet')
+MANIFEST_PATH = os.path.join(DATA_DIR, 'Combined', 'rail_monthly.manifest.json')
+CACHE_DIR = os.path.join(DATA_DIR, 'Combined', '.build')
+STAT_PATH = os.path.join(CACHE_DIR, 'stat.json')
+LOCK_PATH = os.path.join(CACHE_DIR, 'rebuild.lock')
+
+_thread_lock = threading.Lock()
+
+SOURCES = {
+    'otp': os.path.join(DATA_DIR, 'OPT', 'RAIL_OTP_DATA.csv'),
+    'mdbf': os.path.join(DATA_DIR, 'MDBF', 'RAIL_MDBF_DATA.csv'),
+    'cancellations': os.path.join(DATA_DIR, 'RAIL_CANCELLATIONS_DATA.csv'),
+}
+
+MONTH_MAP = {
+    'JANUARY': 1, 'FEBRUARY': 2, 'MARCH': 3, 'APRIL': 4,
+    'MAY': 5, 'JUNE': 6, 'JULY': 7, 'AUGUST': 8,
+    'SEPTEMBER': 9, 'OCTOBER': 10, 'NOVEMBER': 11, 'DECEMBER': 12
+}
+MONTH_NAMES = {num: name for name, num in MONTH_MAP.items()}
+
+
+def _column_name(prefix, label):
+    """Turn a STATUS/CATEGORY label into an upper snake case column name"""
+    cleaned = ''.join(ch if ch.isalnum() else '_' for ch in label.strip().upper())
+    return prefix + '_'.join(part for part in cleaned.split('_') if part)
+
+
+def _add_month_key(df):
+    """Normalise YEAR/MONTH and add the integer YM join key"""
+    month_num = df['MONTH'].str.strip().str.upper().map(MONTH_MAP)
+    if month_num.isna().any():
+        bad = sorted(df.loc[month_num.isna(), 'MONTH'].unique())
+        raise ValueError(f"Unknown month names: {bad}")
+    df['YM'] = (df['YEAR'].astype('int32') * 100 + month_num).astype('int32')
+    return df.drop(columns=['YEAR', 'MONTH'])
+
+
+def parse_otp(path):
+    """Pivot on-time performance STATUS rows into wide count columns"""
+    df = _add_month_key(pd.read_csv(path))
+    counts = df.pivot_table(index='YM', columns='STATUS', values='COUNT', aggfunc='sum', fill_value=0)
+    counts.columns = [_column_name('OTP_', status) + '_COUNT' for status in counts.columns]
+    totals = df.groupby('YM').agg(OTP_TOTAL=('TOTAL', 'max'))
+    wide = counts.join(totals).astype('int32')
+
+    # Keep the published on-time percentage rather than recomputing it
+    on_time = df[df['STATUS'].str.strip() == 'On Time'].set_index('YM')['PERCENTAGE']
+    wide['ON_TIME_PERCENTAGE'] = on_time.astype('float32')
+    return wide
+
+
+def parse_mdbf(path):
+    """Parse mean distance between failures into one column per month"""
+    df = _add_month_key(pd.read_csv(path))
+    wide = df.set_index('YM').rename(columns={'MDBF': 'MEAN_DISTANCE_BEFORE_FAILURE'})
+    return wide.astype('int32')
+
+
+def parse_cancellations(path):
+    """Pivot cancellation CATEGORY rows into wide count columns"""
+    df = _add_month_key(pd.read_csv(path))
+    df['CATEGORY'] = df['CATEGORY'].str.strip()
+    counts = df.pivot_table(index='YM', columns='CATEGORY', values='CANCEL_COUNT', aggfunc='sum', fill_value=0)
+    counts.columns = [_column_name('CANCEL_', category) for category in counts.columns]
+    totals = df.groupby('YM').agg(CANCEL_TOTAL=('CANCEL_TOTAL', 'max'))
+    wide = counts.join(totals).astype('int32')
+
+    # The page analyses mechanical cancellations, so expose them as the headline columns
+    mechanical = df[df['CATEGORY'] == 'Mechanical'].set_index('YM')
+    wide['CANCEL_COUNT'] = mechanical['CANCEL_COUNT'].astype('int32')
+    wide['CANCEL_PERCENTAGE'] = mechanical['CANCEL_PERCENTAGE'].astype('float32')
+    return wide.dropna(subset=['CANCEL_COUNT'])
+
+
+PARSERS = {
+    'otp': parse_otp,
+    'mdbf': parse_mdbf,
+    'cancellations': parse_cancellations,
+}
+
+
+def _read_json(path, default):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return default
+
+
+def _load_manifest():
+    return _read_json(MANIFEST_PATH, {'sources': {}})
+
+
+def _atomic_write(path, write):
+    """Call ``write(tmp_path)`` and move the result over ``path`` in one step.
+
+    Readers in other threads or processes see either the old or the new file,
+    never a partly written one.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.' + os.path.basename(path), suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _write_json(path, data):
+    def write(tmp_path):
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+    _atomic_write(path, write)
+
+
+@contextmanager
+def _build_lock():
+    """Serialize rebuilds across threads and processes sharing the data directory"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with _thread_lock, open(LOCK_PATH, 'w') as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _source_hash(path, previous):
+    """Return (stat_entry, sha256), hashing only when the mtime/size changed"""
+    stat = os.stat(path)
+    if previous.get('mtime_ns') == stat.st_mtime_ns and previous.get('size') == stat.st_size:
+        return previous, previous['sha256']
+    digest = file_sha256(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}, digest
+
+
+def _cache_path(name, digest):
+    return os.path.join(CACHE_DIR, f'{name}.{digest[:16]}.parquet')
+
+
+def _join_sources(parts):
+    """Join the wide per-source frames on YM and add the page's helper columns"""
+    df = parts['cancellations'].join(parts['otp'], how='left').join(parts['mdbf'], how='left')
+    df = df.sort_index().reset_index()
+
+    df['YEAR'] = (df['YM'] // 100).astype('int16')
+    df['MONTH_NUM'] = (df['YM'] % 100).astype('int8')
+    df['MONTH'] = df['MONTH_NUM'].map(MONTH_NAMES).astype('category')
+    df['DATE'] = pd.to_datetime({'year': df['YEAR'], 'month': df['MONTH_NUM'], 'day': 1})
+    return df
+
+
+def build_rail_dataset(force=False, verbose=False):
+    """Rebuild the Parquet artifact if any source's content changed and return its path.
+
+    The committed manifest only records content hashes, so a fresh checkout
+    with unchanged sources never rewrites tracked files. mtime/size state used
+    to skip rehashing lives in the ignored build directory.
+    """
+    with _build_lock():
+        manifest = _load_manifest()
+        stats = _read_json(STAT_PATH, {})
+
+        digests = {}
+        new_stats = {}
+        for name, path in SOURCES.items():
+            new_stats[name], digests[name] = _source_hash(path, stats.get(name, {}))
+        if new_stats != stats:
+            _write_json(STAT_PATH, new_stats)
+
+        built_from = {name: entry.get('sha256') for name, entry in manifest['sources'].items()}
+        if not force and built_from == digests and os.path.exists(ARTIFACT_PATH):
+            if verbose:
+                print("Rail dataset is up to date")
+            return ARTIFACT_PATH
+
+        parts = {}
+        for name, path in SOURCES.items():
+            cache_path = _cache_path(name, digests[name])
+            if os.path.exists(cache_path) and not force:
+                parts[name] = pd.read_parquet(cache_path)
+                continue
+            if verbose:
+                print(f"Parsing {name}: {path}")
+            parts[name] = PARSERS[name](path)
+            _atomic_write(cache_path, parts[name].to_parquet)
+            # Drop caches of older versions of this source
+            for old in glob.glob(os.path.join(CACHE_DIR, f'{name}.*.parquet')):
+                if old != cache_path:
+                    os.remove(old)
+
+        df = _join_sources(parts)
+        _atomic_write(ARTIFACT_PATH, lambda tmp_path: df.to_parquet(tmp_path, index=False, compression='zstd'))
+        _write_json(MANIFEST_PATH, {'sources': {name: {'sha256': digest} for name, digest in digests.items()}})
+        if verbose:
+            print(f"Wrote {ARTIFACT_PATH}")
+        return ARTIFACT_PATH
+
+
+def load_rail_dataset():
+    """Return the joined monthly dataset, rebuilding it first if it is stale"""
+    return pd.read_parquet(build_rail_dataset())
+
+
+def dataset_version():
+    """Return a short hash of the source files the current dataset was built from"""
+    build_rail_dataset()
+    sources = _load_manifest()['sources']
+    digest = hashlib.sha256()
+    for name in sorted(sources):
+        digest.update(f"{name}:{sources[name]['sha256']}\n".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the monthly rail Parquet dataset")
+    parser.add_argument('--force', action='store_true', help="Reparse every source")
+    args = parser.parse_args()
+    build_rail_dataset(force=args.force, verbose=True)
@@ -0,0 +1,120 @@
+"""Read-only store of precomputed serving artifacts shared by worker processes.
+
+A parent process calls ``build_serving_store`` once. It writes the delay model
+arrays and the cancellation prediction tables into a single aligned payload,
+by default on ``/dev/shm``. A delay model saved as a bundle or as the legacy
+joblib forest is flattened into plain arrays. Workers started with
+``NJT_SHARED_DIR`` pointing at that directory map it read-only. The pages then
+skip loading or fitting their own copies, so an extra worker adds almost no
+memory. The FAQ file is small and each worker still reads its own copy.
+"""
+import json
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from utils.model_bundle import ModelBundleError, TreeEnsembleModel, load_delay_model, map_arrays, write_arrays
+
+SHARED_DIR_ENV = 'NJT_SHARED_DIR'
+STORE_META = 'store.json'
+STORE_PAYLOAD = 'store.bin'
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), '..', 'models')
+
+
+class SharedStore:
+    """Read-only view over a store directory written by ``write_store``"""
+
+    def __init__(self, store_dir):
+        with open(os.path.join(store_dir, STORE_META), 'r') as file:
+            store = json.load(file)
+        self.store_dir = store_dir
+        self.meta = store['meta']
+        self.arrays = map_arrays(os.path.join(store_dir, STORE_PAYLOAD), store['layout'])
+
+    def __contains__(self, name):
+        return name in self.arrays
+
+    def __getitem__(self, name):
+        return self.arrays[name]
+
+    def has_delay_model(self):
+        return self.meta.get('delay_model') is not None
+
+    def delay_model(self):
+        """Return (model, features_list, metrics) backed by the shared arrays"""
+        info = self.meta['delay_model']
+        arrays = {name.split('/', 1)[1]: array for name, array in self.arrays.items() if name.startswith('delay/')}
+        model = TreeEnsembleModel(arrays, feature_names=info['feature_schema'], **info['params'])
+        return model, info['feature_schema'], info['metrics']
+
+    def month_predictions(self, month):
+        """Return (future_dates, predictions) for a month number in 1..12"""
+        future_dates = self.arrays['cancel/future_dates'][month - 1]
+        return future_dates.tolist(), self.arrays['cancel/predictions'][month - 1]
+
+    def feature_importance(self):
+        """Return the cancellation model's feature importances as a DataFrame"""
+        return pd.DataFrame({
+            'Feature': self.meta['cancel_features'],
+            'Importance': self.arrays['cancel/importance']
+        }).sort_values('Importance', ascending=False)
+
+
+def write_store(store_dir, arrays, meta):
+    """Write named arrays and JSON metadata into a store directory"""
+    os.makedirs(store_dir, exist_ok=True)
+    layout = write_arrays(os.path.join(store_dir, STORE_PAYLOAD), arrays)
+    with open(os.path.join(store_dir, STORE_META), 'w') as file:
+        json.dump({'layout': layout, 'meta': meta}, file)
+
+
+def build_serving_store(store_dir, model_dir=MODEL_DIR):
+    """Precompute everything the pages need and write it into ``store_dir``"""
+    from utils import cancellations
+    from utils.rail_data import dataset_version, load_rail_dataset
+
+    arrays = {}
+    meta = {}
+
+    # Delay model: tree ensembles, from a bundle or the legacy joblib pickle, are shared as plain arrays
+    meta['delay_model'] = None
+    try:
+        model, features_list, metrics = load_delay_model(model_dir)
+    except (ModelBundleError, OSError) as e:
+        print(f"Delay model not shared: {e}")
+    else:
+        if not isinstance(model, TreeEnsembleModel):
+            print(f"Delay model not shared: {type(model).__name__} is not a supported tree ensemble")
+        else:
+            for name in ('roots', 'left', 'right', 'feature', 'threshold', 'value'):
+                arrays[f'delay/{name}'] = getattr(model, name)
+            meta['delay_model'] = {
+                'feature_schema': list(features_list),
+                'metrics': {name: float(value) for name, value in metrics.items()},
+                'params': {'base': model.base, 'scale': model.scale, 'max_depth': int(model.max_depth)},
+            }
+
+    # Cancellation forest: workers only need its predictions and importances
+    data = load_rail_dataset()
+    forest = cancellations.fit_cancellation_model(data)
+    future_dates, predictions = cancellations.month_prediction_table(data, forest)
+    arrays['cancel/future_dates'] = future_dates
+    arrays['cancel/predictions'] = predictions
+    arrays['cancel/importance'] = forest.feature_importances_
+    meta['cancel_features'] = cancellations.FEATURES
+    # Pages ignore the tables once the dataset is rebuilt from changed sources
+    meta['dataset_version'] = dataset_version()
+
+    write_store(store_dir, arrays, meta)
+    return store_dir
+
+
+@lru_cache(maxsize=None)
+def open_shared_store():
+    """Return the store named by ``NJT_SHARED_DIR``, or None when not serving from one"""
+    store_dir = os.environ.get(SHARED_DIR_ENV)
+    if not store_dir:
+        return None
+    return SharedStore(store_dir)